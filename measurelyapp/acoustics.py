@@ -16,18 +16,29 @@ Designed to contextualise measurement results, not alter them.
 Author: Matt + AI
 """
 
+import logging
+from math import sqrt
+
 import numpy as np
 
 DEBUG = True
+log = logging.getLogger("measurely.acoustics")
 C = 343.0  # speed of sound (m/s)
+_HALF_C = C / 2.0
 
 
 # ------------------------------------------------------------
 # Logging
 # ------------------------------------------------------------
-def _log(section, msg):
-    if DEBUG:
-        print(f"[ACOUSTICS:{section.upper()}] {msg}")
+# DEBUG=True surfaces these at INFO (shown by analyse's basicConfig);
+# otherwise they drop to DEBUG. %-args are only formatted if emitted.
+_LEVEL = logging.INFO if DEBUG else logging.DEBUG
+
+def _log(section, msg, *args):
+    log.log(_LEVEL, "[ACOUSTICS:%s] " + msg, section.upper(), *args)
+
+def _log_enabled():
+    return log.isEnabledFor(_LEVEL)
 
 
 # ------------------------------------------------------------
@@ -42,13 +53,14 @@ def compute_room_geometry(room):
     area = 2.0 * (L * W + L * H + W * H)
 
     # Schroeder frequency estimate (geometry-only placeholder)
-    f_sch = 2000.0 / max(np.sqrt(vol), 1e-6)
+    # a negative dimension gives NaN here, exactly as np.sqrt did (minus
+    # the RuntimeWarning) -- no modes then compare below it
+    f_sch = 2000.0 / max(sqrt(vol) if vol >= 0 else float("nan"), 1e-6)
 
     _log(
         "geometry",
-        f"L={L:.2f}m W={W:.2f}m H={H:.2f}m | "
-        f"V={vol:.1f}m³ A={area:.1f}m² | "
-        f"Schroeder≈{f_sch:.1f}Hz"
+        "L=%.2fm W=%.2fm H=%.2fm | V=%.1fm³ A=%.1fm² | Schroeder≈%.1fHz",
+        L, W, H, vol, area, f_sch,
     )
 
     return {
@@ -64,29 +76,49 @@ def compute_room_geometry(room):
 # ------------------------------------------------------------
 # 2. AXIAL ROOM MODES
 # ------------------------------------------------------------
-def compute_room_modes(room, max_modes=15):
-    dims = {
-        "length": float(room.get("length_m", 0.0)),
-        "width":  float(room.get("width_m", 0.0)),
-        "height": float(room.get("height_m", 0.0)),
-    }
+def _dims(room, geom=None):
+    """(L, W, H) from an already computed geometry, else from the room JSON."""
+    if geom is not None:
+        return geom["L"], geom["W"], geom["H"]
+    return (float(room.get("length_m", 0.0)),
+            float(room.get("width_m", 0.0)),
+            float(room.get("height_m", 0.0)))
+
+
+def _axial_modes(room, max_modes=15, geom=None, f_max=None):
+    """(axes, orders, freqs) of every axial mode, sorted by frequency.
+    One outer product over (axis, order); ties keep length/width/height order.
+    f_max drops modes at or above it before the sort."""
+    names = np.array(["length", "width", "height"])
+    dims = np.array(_dims(room, geom))
+    keep = dims > 0
+    names, dims = names[keep], dims[keep]
+
+    n = np.arange(1, max_modes + 1)
+    freqs = (_HALF_C * (n[None, :] / dims[:, None])).ravel()
+    axes = np.repeat(names, max_modes)
+    orders = np.tile(n, names.size)
+    if f_max is not None:
+        keep = freqs < f_max
+        axes, orders, freqs = axes[keep], orders[keep], freqs[keep]
+    order = np.argsort(freqs, kind="stable")
+    return axes[order], orders[order], freqs[order]
 
-    modes = []
 
-    for axis, dim in dims.items():
-        if dim <= 0:
-            continue
-        for n in range(1, max_modes + 1):
-            f = (C / 2.0) * (n / dim)
-            modes.append({"axis": axis, "order": n, "freq_hz": f})
+def compute_room_modes(room, max_modes=15):
+    axes, orders, freqs = _axial_modes(room, max_modes)
 
-    modes.sort(key=lambda m: m["freq_hz"])
+    modes = [
+        {"axis": a, "order": o, "freq_hz": f}
+        for a, o, f in zip(axes.tolist(), orders.tolist(), freqs.tolist())
+    ]
 
-    _log(
-        "modes",
-        "Lowest axial modes: "
-        + ", ".join(f"{m['freq_hz']:.1f}Hz({m['axis'][0]})" for m in modes[:8])
-    )
+    if _log_enabled():
+        _log(
+            "modes",
+            "Lowest axial modes: %s",
+            ", ".join(f"{m['freq_hz']:.1f}Hz({m['axis'][0]})" for m in modes[:8]),
+        )
 
     return modes
 
@@ -104,11 +136,12 @@ def compute_sbir(room):
     f0 = C / (4.0 * d)
     nulls = [f0 * (2 * k + 1) for k in range(6)]
 
-    _log(
-        "sbir",
-        f"front-wall distance={d:.2f}m → "
-        f"nulls={', '.join(f'{n:.1f}Hz' for n in nulls)}"
-    )
+    if _log_enabled():
+        _log(
+            "sbir",
+            "front-wall distance=%.2fm → nulls=%s",
+            d, ", ".join(f"{n:.1f}Hz" for n in nulls),
+        )
 
     return {
         "distance_m": d,
@@ -142,8 +175,8 @@ def compute_triangle(room):
 
     _log(
         "triangle",
-        f"spacing={spacing:.2f}m listener={listener:.2f}m "
-        f"ratio={ratio:.2f} penalty={penalty}"
+        "spacing=%.2fm listener=%.2fm ratio=%.2f penalty=%d",
+        spacing, listener, ratio, penalty,
     )
 
     return {
@@ -156,23 +189,18 @@ def compute_triangle(room):
 # ------------------------------------------------------------
 # 5. ROOM GAIN ESTIMATE
 # ------------------------------------------------------------
-def compute_room_gain(room):
-    L = float(room.get("length_m", 0.0))
-    W = float(room.get("width_m", 0.0))
-    H = float(room.get("height_m", 0.0))
+def compute_room_gain(room, geom=None):
+    L, W, H = _dims(room, geom)
 
     if min(L, W, H) <= 0:
         _log("roomgain", "Invalid dimensions")
         return {"gain_hz": None, "gain_db": None}
 
     dim_min = min(L, W, H)
-    gain_freq = C / (2.0 * dim_min)
+    gain_freq = _HALF_C / dim_min
     gain_db = 3.0 + max(0.0, 20.0 - dim_min) * 0.1
 
-    _log(
-        "roomgain",
-        f"gain onset≈{gain_freq:.1f}Hz magnitude≈{gain_db:.1f}dB"
-    )
+    _log("roomgain", "gain onset≈%.1fHz magnitude≈%.1fdB", gain_freq, gain_db)
 
     return {
         "gain_hz": gain_freq,
@@ -184,21 +212,22 @@ def compute_room_gain(room):
 # MASTER: FULL ROOM MODEL
 # ------------------------------------------------------------
 def analyse_room(room):
-    _log("input", f"Room JSON keys={list(room.keys())}")
+    _log("input", "Room JSON keys=%s", list(room))
 
     geometry = compute_room_geometry(room)
-    modes = compute_room_modes(room)
+    sch = geometry["schroeder_hz"]
+    # arrays, not dicts, and only the modes below Schroeder -- the only
+    # ones counted or kept below
+    axes, _, freqs = _axial_modes(room, geom=geometry, f_max=sch)
     sbir = compute_sbir(room)
     triangle = compute_triangle(room)
-    gain = compute_room_gain(room)
+    gain = compute_room_gain(room, geom=geometry)
 
     # --------------------------------------------------------
     # SEVERITY & CONTEXT FACTORS
     # --------------------------------------------------------
-    sch = geometry["schroeder_hz"]
-
-    low_modes = [m for m in modes if m["freq_hz"] < sch]
-    modal_severity = min(len(low_modes) / 10.0, 1.0)
+    n_low = freqs.size
+    modal_severity = min(n_low / 10.0, 1.0)
 
     d = sbir.get("distance_m")
     if d is None:
@@ -221,30 +250,32 @@ def analyse_room(room):
 
     _log(
         "severity",
-        f"modal={modal_severity:.2f} sbir={sbir_severity:.2f} "
-        f"combined={combined:.2f}"
+        "modal=%.2f sbir=%.2f combined=%.2f",
+        modal_severity, sbir_severity, combined,
     )
 
-    _log(
-        "factors",
-        f"room_factor={room_factor:.2f} stereo_factor={stereo_factor:.2f}"
-    )
+    _log("factors", "room_factor=%.2f stereo_factor=%.2f", room_factor, stereo_factor)
 
     # --------------------------------------------------------
     # TRIM MODES FOR AI / UI (CRITICAL)
     # --------------------------------------------------------
     MAX_AI_MODES = 8
 
+    k = min(n_low, MAX_AI_MODES)
     trimmed_modes = [
         {
-            "axis": m["axis"],
-            "freq_hz": round(m["freq_hz"], 1),
+            "axis": a,
+            "freq_hz": round(f, 1),
         }
-        for m in modes
-        if m["freq_hz"] < geometry["schroeder_hz"]
+        for a, f in zip(axes[:k].tolist(), freqs[:k].tolist())
     ]
 
-    trimmed_modes = trimmed_modes[:MAX_AI_MODES]
+    if _log_enabled():
+        _log(
+            "modes",
+            "Lowest axial modes below Schroeder: %s",
+            ", ".join(f"{f:.1f}Hz({a[0]})" for a, f in zip(axes[:8].tolist(), freqs[:8].tolist())),
+        )
 
     return {
         "geometry": geometry,
@@ -6,6 +6,7 @@ from pathlib import Path
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 
 
 def load_meta_for_analysis(analysis_path: Path):
@@ -48,6 +49,34 @@ TEMPERATURE = 0.5
 
 client = OpenAI(api_key=OPENAI_API_KEY)
 
+# Every request below except the client summary (which needs the room
+# report) is independent, so they are all sent up front on a small pool
+# and collected in order: wall time ~ the slowest call, not the sum.
+pool = ThreadPoolExecutor(max_workers=4)
+
+
+def chat(system: str, prompt: str, temperature: float, context: str | None = None) -> str:
+    # context (the big data blocks) goes first so calls sharing it share a
+    # prompt prefix, which is what OpenAI's automatic prompt caching keys on
+    lead = [{"role": "system", "content": context}] if context else []
+    response = client.chat.completions.create(
+        model=MODEL,
+        temperature=temperature,
+        messages=[
+            *lead,
+            {
+                "role": "system",
+                "content": system
+            },
+            {
+                "role": "user",
+                "content": prompt
+            },
+        ],
+    )
+    return response.choices[0].message.content.strip()
+
+
 previous_summary = ""
 if AI_OVERALL_FILE.exists():
     try:
@@ -74,6 +103,23 @@ speaker = speakers_db.get(speaker_key, {}) if speaker_key else {}
 
 friendly_name = speaker.get("friendly_name") or "your speakers"
 
+# -------------------------------------------------
+# SHARED DATA CONTEXT (CACHEABLE PROMPT PREFIX)
+# -------------------------------------------------
+# Stable blocks first, stable key order: byte-identical across calls and
+# runs, so only the MEASUREMENTS tail can break the cached prefix. The
+# shared part is serialised once, not per request.
+CONTEXT_HEAD = (
+    "REFERENCE DATA FOR THIS SYSTEM\n\n"
+    f"ROOM:\n{json.dumps(room_data, indent=2, sort_keys=True)}\n\n"
+    f"SPEAKER PROFILE:\n{json.dumps(speaker, indent=2, sort_keys=True)}\n\n"
+)
+
+def data_context(measurements) -> str:
+    return f"{CONTEXT_HEAD}MEASUREMENTS:\n{json.dumps(measurements, indent=2, sort_keys=True)}"
+
+listening_context = data_context(analysis_data)
+
 # -------------------------------------------------
 # OVERALL SUMMARY
 # -------------------------------------------------
@@ -95,10 +141,10 @@ SYSTEM CONTEXT
 - This summary may be regenerated as the system or room changes
 
 LISTENING DATA
-{json.dumps(analysis_data, indent=2)}
+- The MEASUREMENTS block in the reference data
 
 ROOM CONTEXT
-{json.dumps(room_data, indent=2)}
+- The ROOM block in the reference data
 
 RULES
 - Write exactly TWO sentences
@@ -129,95 +175,24 @@ PREVIOUS SUMMARY (DO NOT REUSE PHRASING)
 {previous_summary}
 """.strip()
 
-overall_response = client.chat.completions.create(
-    model=MODEL,
-    temperature=TEMPERATURE,
-    messages=[
-        {
-            "role": "system",
-            "content": (
-                "You are a relaxed, experienced hi-fi listener chatting to the system’s owner "
-                "after spending time listening. You are positive by default and never sound critical."
-            )
-        },
-        {
-            "role": "user",
-            "content": overall_prompt
-        },
-    ],
-)
-
-overall_summary = overall_response.choices[0].message.content.strip()
-
-# -------------------------------------------------
-# TONE GUARD (ANTI-GUSH FILTER)
-# -------------------------------------------------
-BANNED_PHRASES = [
-    "lose track of time",
-    "fills the room",
-    "smooth quality",
-    "flowing",
-    "beautiful",
-    "delightful",
-    "inviting",
-    "rich",
-    "immersive",
-    "enhance the",
-    "experience"
-
-    # NEW: polite audiophile filler
-    "nice openness",
-    "details come through",
-    "easy to appreciate",
-    "blends together",
-    "the music",
-    "sound coming from"
-
-]
-
-def contains_banned_language(text: str) -> bool:
-    lower = text.lower()
-    return any(p in lower for p in BANNED_PHRASES)
-
-
-if contains_banned_language(overall_summary):
-    # Retry once, slightly colder
-    retry_response = client.chat.completions.create(
-        model=MODEL,
-        temperature=0.3,
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a plain-speaking, understated hi-fi listener. "
-                    "You avoid flowery or atmospheric language."
-                )
-            },
-            {
-                "role": "user",
-                "content": overall_prompt
-            },
-        ],
+try:
+    overall_future = pool.submit(
+        chat,
+        "You are a relaxed, experienced hi-fi listener chatting to the system’s owner "
+        "after spending time listening. You are positive by default and never sound critical.",
+        overall_prompt,
+        TEMPERATURE,
+        listening_context,
     )
-    overall_summary = retry_response.choices[0].message.content.strip()
-
-
-AI_OVERALL_FILE.write_text(json.dumps({
-    "model": MODEL,
-    "generated_at": datetime.now(timezone.utc).isoformat(),
-    "summary": overall_summary
-}, indent=2))
 
-print("\n--- OVERALL SUMMARY ---\n")
-print(overall_summary)
 
-# -------------------------------------------------
-# ROOM CHARACTER (DEEP DIVE)
-# -------------------------------------------------
+    # -------------------------------------------------
+    # ROOM CHARACTER (DEEP DIVE)
+    # -------------------------------------------------
 
-# STEP 1 — INTERNAL ROOM PERSONALITY (ANALYSIS ONLY)
+    # STEP 1 — INTERNAL ROOM PERSONALITY (ANALYSIS ONLY)
 
-room_personality_prompt = f"""
+    room_personality_prompt = f"""
 You are an experienced acoustic consultant analysing a real listening room.
 You are speaking to another professional, not the client.
 
@@ -239,51 +214,37 @@ DO NOT:
 - Use marketing language
 
 DATA
-Measurements:
-{json.dumps(analysis_data, indent=2)}
-
-Room:
-{json.dumps(room_data, indent=2)}
+Use the MEASUREMENTS and ROOM blocks in the reference data.
 
 OUTPUT
 Write structured prose, not bullets.
 """
 
-room_personality_response = client.chat.completions.create(
-    model=MODEL,
-    temperature=0.3,
-    messages=[
-        {
-            "role": "system",
-            "content": (
-                "You are a senior acoustic consultant analysing a listening room "
-                "for another professional."
-            )
-        },
-        {
-            "role": "user",
-            "content": room_personality_prompt
-        },
-    ],
-)
+    room_personality_future = pool.submit(
+        chat,
+        "You are a senior acoustic consultant analysing a listening room "
+        "for another professional.",
+        room_personality_prompt,
+        0.3,
+        listening_context,
+    )
 
-room_personality_text = room_personality_response.choices[0].message.content.strip()
 
-analysis_for_room_report = {}
+    analysis_for_room_report = {}
 
-for k, v in analysis_data.items():
-    if any(x in k.lower() for x in [
-        "band",
-        "bass",
-        "mid",
-        "treble",
-        "balance"
-    ]):
-        continue
-    analysis_for_room_report[k] = v
+    for k, v in analysis_data.items():
+        if any(x in k.lower() for x in [
+            "band",
+            "bass",
+            "mid",
+            "treble",
+            "balance"
+        ]):
+            continue
+        analysis_for_room_report[k] = v
 
 
-room_report_prompt = f"""
+    room_report_prompt = f"""
 You are writing a factual listening-room behaviour report for an informed,
 non-academic reader.
 
@@ -375,14 +336,7 @@ Do NOT use “clarity” to describe timing or reflection effects.
 
 SUPPORTING DATA (REFERENCE ONLY)
 
-Measurements:
-{json.dumps(analysis_for_room_report, indent=2)}
-
-Room:
-{json.dumps(room_data, indent=2)}
-
-Speaker Profile:
-{json.dumps(speaker, indent=2)}
+The MEASUREMENTS, ROOM and SPEAKER PROFILE blocks in the reference data.
 
 STRUCTURE (FOLLOW EXACTLY)
 
@@ -396,120 +350,45 @@ If any sentence sounds like judgement, advice, or comparison,
 rewrite it as a neutral statement of behaviour.
 """
 
+    room_report_future = pool.submit(
+        chat,
+        "You are an experienced acoustic consultant explaining findings clearly "
+        "to a technically curious listener.",
+        room_report_prompt,
+        0.3,
+        data_context(analysis_for_room_report),
+    )
 
-room_report_response = client.chat.completions.create(
-    model=MODEL,
-    temperature=0.3,
-    messages=[
-        {
-            "role": "system",
-            "content": (
-                "You are an experienced acoustic consultant explaining findings clearly "
-                "to a technically curious listener."
-            )
-        },
-        {
-            "role": "user",
-            "content": room_report_prompt
-        },
-    ],
-)
-
-room_report_text = room_report_response.choices[0].message.content.strip()
-
-
-(LATEST_DIR / "room_report.json").write_text(
-    json.dumps({
-        "model": MODEL,
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "report": room_report_text
-    }, indent=2)
-)
-
-print("\n--- ROOM REPORT ---\n")
-print(room_report_text)
-
-
-
-# STEP 3 — CLIENT ROOM SUMMARY (ONE PARAGRAPH)
-
-client_summary_prompt = f"""
-You are explaining the room to a client in one paragraph.
-
-INPUT:
-{room_report_text}
-
-RULES
-- One paragraph
-- No numbers
-- No causes
-- No fixes
-- No judgement
-- No audiophile clichés
-
-GOAL
-Explain how the room sounds, not why.
-"""
-
-client_summary_response = client.chat.completions.create(
-    model=MODEL,
-    temperature=0.3,
-    messages=[
-        {
-            "role": "system",
-            "content": (
-                "You are a calm, confident professional explaining room character "
-                "to a client in plain language."
-            )
-        },
-        {
-            "role": "user",
-            "content": client_summary_prompt
-        },
-    ],
-)
-
-client_room_summary = client_summary_response.choices[0].message.content.strip()
-
-print("\n--- CLIENT ROOM SUMMARY ---\n")
-print(client_room_summary)
-
-(LATEST_DIR / "room_client_summary.json").write_text(
-    json.dumps({
-        "model": MODEL,
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "summary": client_room_summary
-    }, indent=2)
-)
 
-# -------------------------------------------------
-# SWEEP COMPARISON (REAL SESSIONS + NOTES)
-# -------------------------------------------------
-sweep_files = sorted(
-    MEASUREMENTS_DIR.glob("Sweep*/analysis.json"),
-    key=lambda p: p.stat().st_mtime,
-    reverse=True
-)
+    # -------------------------------------------------
+    # SWEEP COMPARISON (REAL SESSIONS + NOTES)
+    # -------------------------------------------------
+    sweep_files = sorted(
+        MEASUREMENTS_DIR.glob("Sweep*/analysis.json"),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True
+    )
 
-if len(sweep_files) >= 2:
-    AI_COMPARE_FILE = sweep_files[0].parent / "ai_compare.json"
-    latest_analysis = json.loads(sweep_files[0].read_text())
-    previous_analysis = json.loads(sweep_files[1].read_text())
+    compare_future = None
+    if len(sweep_files) >= 2:
+        AI_COMPARE_FILE = sweep_files[0].parent / "ai_compare.json"
+        latest_analysis = json.loads(sweep_files[0].read_text())
+        previous_analysis = json.loads(sweep_files[1].read_text())
 
-    latest_meta = load_meta_for_analysis(sweep_files[0])
-    previous_meta = load_meta_for_analysis(sweep_files[1])
+        latest_meta = load_meta_for_analysis(sweep_files[0])
+        previous_meta = load_meta_for_analysis(sweep_files[1])
 
-    latest = {
-        "analysis": latest_analysis,
-        "user_notes": latest_meta.get("notes") or "No user notes recorded for this sweep."
-    }
+        latest = {
+            "analysis": latest_analysis,
+            "user_notes": latest_meta.get("notes") or "No user notes recorded for this sweep."
+        }
 
-    previous = {
-        "analysis": previous_analysis,
-        "user_notes": previous_meta.get("notes") or "No user notes recorded for this sweep."
-    }
+        previous = {
+            "analysis": previous_analysis,
+            "user_notes": previous_meta.get("notes") or "No user notes recorded for this sweep."
+        }
 
-    compare_prompt = f"""
+        compare_prompt = f"""
 DEBUG — USER NOTES
 LATEST: {latest["user_notes"]}
 PREVIOUS: {previous["user_notes"]}
@@ -534,32 +413,140 @@ STRICT RULES
 - Do not mention equipment or room changes
 """.strip()
 
-    compare_response = client.chat.completions.create(
-        model=MODEL,
-        temperature=TEMPERATURE,
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a calm, precise acoustic measurement engineer writing for an informed audiophile."
-                )
-            },
-            {
-                "role": "user",
-                "content": compare_prompt
-            },
-        ],
-    )
-
-    compare_summary = compare_response.choices[0].message.content.strip()
-
-    AI_COMPARE_FILE.write_text(json.dumps({
+        compare_future = pool.submit(
+            chat,
+            "You are a calm, precise acoustic measurement engineer writing for an informed audiophile.",
+            compare_prompt,
+            TEMPERATURE,
+        )
+
+
+    # -------------------------------------------------
+    # TONE GUARD (ANTI-GUSH FILTER)
+    # -------------------------------------------------
+    BANNED_PHRASES = [
+        "lose track of time",
+        "fills the room",
+        "smooth quality",
+        "flowing",
+        "beautiful",
+        "delightful",
+        "inviting",
+        "rich",
+        "immersive",
+        "enhance the",
+        "experience"
+
+        # NEW: polite audiophile filler
+        "nice openness",
+        "details come through",
+        "easy to appreciate",
+        "blends together",
+        "the music",
+        "sound coming from"
+
+    ]
+
+    def contains_banned_language(text: str) -> bool:
+        lower = text.lower()
+        return any(p in lower for p in BANNED_PHRASES)
+
+
+    overall_summary = overall_future.result()
+
+    if contains_banned_language(overall_summary):
+        # Retry once, slightly colder
+        overall_summary = chat(
+            "You are a plain-speaking, understated hi-fi listener. "
+            "You avoid flowery or atmospheric language.",
+            overall_prompt,
+            0.3,
+            listening_context,
+        )
+
+    AI_OVERALL_FILE.write_text(json.dumps({
         "model": MODEL,
         "generated_at": datetime.now(timezone.utc).isoformat(),
-        "summary": compare_summary
+        "summary": overall_summary
     }, indent=2))
 
-    print("\n--- SWEEP COMPARISON ---\n")
-    print(compare_summary)
+    print("\n--- OVERALL SUMMARY ---\n")
+    print(overall_summary)
+
+    # -------------------------------------------------
+    # ROOM CHARACTER (DEEP DIVE) — RESULTS
+    # -------------------------------------------------
+    room_personality_text = room_personality_future.result()
+
+    room_report_text = room_report_future.result()
+
+    (LATEST_DIR / "room_report.json").write_text(
+        json.dumps({
+            "model": MODEL,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "report": room_report_text
+        }, indent=2)
+    )
+
+    print("\n--- ROOM REPORT ---\n")
+    print(room_report_text)
+
+
+
+    # STEP 3 — CLIENT ROOM SUMMARY (ONE PARAGRAPH)
+
+    client_summary_prompt = f"""
+You are explaining the room to a client in one paragraph.
+
+INPUT:
+{room_report_text}
+
+RULES
+- One paragraph
+- No numbers
+- No causes
+- No fixes
+- No judgement
+- No audiophile clichés
+
+GOAL
+Explain how the room sounds, not why.
+"""
+
+    client_room_summary = chat(
+        "You are a calm, confident professional explaining room character "
+        "to a client in plain language.",
+        client_summary_prompt,
+        0.3,
+    )
+
+    print("\n--- CLIENT ROOM SUMMARY ---\n")
+    print(client_room_summary)
+
+    (LATEST_DIR / "room_client_summary.json").write_text(
+        json.dumps({
+            "model": MODEL,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "summary": client_room_summary
+        }, indent=2)
+    )
 
-print(f"\nSaved overall summary to {AI_OVERALL_FILE}")
+    # -------------------------------------------------
+    # SWEEP COMPARISON — RESULT
+    # -------------------------------------------------
+    if compare_future is not None:
+        compare_summary = compare_future.result()
+
+        AI_COMPARE_FILE.write_text(json.dumps({
+            "model": MODEL,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "summary": compare_summary
+        }, indent=2))
+
+        print("\n--- SWEEP COMPARISON ---\n")
+        print(compare_summary)
+
+    print(f"\nSaved overall summary to {AI_OVERALL_FILE}")
+finally:
+    # drop any still-queued requests if something above raised
+    pool.shutdown(cancel_futures=True)
@@ -12,7 +12,8 @@ import numpy as np
 from measurelyapp.io import load_session
 from measurelyapp.signal_math import (
     log_bins,
-    band_mean,
+    band_means,
+    bins_per_octave,
     modes,
     bandwidth_3db,
     smoothness,
@@ -207,8 +208,9 @@ def analyse(session_dir: Path, ppo: int = 48, speaker_key: str | None = None):
     mag_raw = apply_mic_calibration(freq_raw, mag_raw, mic_type="omnitronic_mm2")
 
     lo3, hi3 = bandwidth_3db(freq_raw, mag_raw)
-    mode_list = [m for m in modes(freq_raw, mag_raw) if m["freq_hz"] <= 1000]
-    sm = smoothness(freq_raw, mag_raw)       
+    bpo_raw = bins_per_octave(freq_raw)
+    mode_list = [m for m in modes(freq_raw, mag_raw, bpo=bpo_raw) if m["freq_hz"] <= 1000]
+    sm = smoothness(freq_raw, mag_raw, bpo=bpo_raw)
     # Get all reflections
     raw_refs = early_reflections(ir, fs)
     refs = [r for r in raw_refs if r > 0.5] 
@@ -252,12 +254,10 @@ def analyse(session_dir: Path, ppo: int = 48, speaker_key: str | None = None):
         update_analysis_status("Invalid sweep detected", 100, running=False)
         return export
 
-    bands = {
-        "bass_20_200": band_mean(freq_raw, mag_raw, 20, 200),
-        "mid_200_2k": band_mean(freq_raw, mag_raw, 200, 2000),
-        "treble_2k_10k": band_mean(freq_raw, mag_raw, 2000, 10000),
-        "air_10k_20k": band_mean(freq_raw, mag_raw, 10000, 20000),
-    }
+    bands = dict(zip(
+        ("bass_20_200", "mid_200_2k", "treble_2k_10k", "air_10k_20k"),
+        band_means(freq_raw, mag_raw, (20, 200, 2000, 10000, 20000)),
+    ))
   
     target_curve = load_target_curve(speaker_key)
 
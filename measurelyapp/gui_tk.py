@@ -1,73 +1,76 @@
 #!/usr/bin/env python3
-import sys, os, subprocess, threading, queue, sounddevice as sd, tkinter as tk
+import sys, os, re, time, subprocess, threading, queue, sounddevice as sd, tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
 
 APP_TITLE = "Measurely"
 DEFAULT_ALSA = "hw:2,0"   # Force HiFiBerry by default
 DEFAULT_BACKEND = "aplay" # or "pa"
 
+# an `aplay -l` line like: card 2: sndrpihifiberry [...], device 0: ...
+_HIFIBERRY_RE = re.compile(r"^\s*card\s+(\d+):(?=.*hifiberry).*?\bdevice\s+(\d+):", re.I | re.M)
+
 # ---------------- Device helpers ----------------
+DEVICE_CACHE_TTL = 5.0    # s; one PortAudio/ALSA scan serves both pickers
+_DEV_CACHE = {"t": 0.0, "devs": None}
+
 def list_devices_safe():
+    now = time.monotonic()
+    if _DEV_CACHE["devs"] is not None and now - _DEV_CACHE["t"] < DEVICE_CACHE_TTL:
+        return _DEV_CACHE["devs"]
     try:
-        return sd.query_devices()
+        devs = sd.query_devices()
     except Exception as e:
         print("Device query failed:", e)
         return []
-
-def pick_input_index():
-    devs = list_devices_safe()
-    umik_idx = first_in = None
-    umik_name = first_name = "unknown"
-    for i, d in enumerate(devs):
-        ins = d.get("max_input_channels", 0) or 0
-        name = (d.get("name") or "")
-        if ins > 0 and first_in is None:
-            first_in, first_name = i, name
-        if ins > 0 and "umik" in name.lower():
-            umik_idx, umik_name = i, name
-    return (umik_idx if umik_idx is not None else first_in,
-            umik_name if umik_idx is not None else first_name)
-
-def pick_output_index():
-    devs = list_devices_safe()
-    hat_idx = pulse_idx = first_out = None
-    hat_name = pulse_name = first_name = "unknown"
-    for i, d in enumerate(devs):
+    _DEV_CACHE.update(t=now, devs=devs)
+    return devs
+
+def invalidate_device_cache():
+    _DEV_CACHE["devs"] = None
+
+# DAC HAT / default-sink names, matched against the lowercased device name
+_HAT_RE = re.compile(r"hifiberry|pcm51[02]|es9023|i2s|dac")
+_PULSE_NAMES = frozenset(("default", "sysdefault"))
+
+def pick_devices():
+    """One pass over the device list -> (in_idx, in_name, out_idx, out_name).
+    Input: last UMIK, else first input. Output: last DAC HAT, else last
+    pulse/default, else first output."""
+    umik_idx = first_in = hat_idx = pulse_idx = first_out = None
+    umik_name = first_in_name = hat_name = pulse_name = first_out_name = "unknown"
+    for i, d in enumerate(list_devices_safe()):
+        ins  = d.get("max_input_channels", 0) or 0
         outs = d.get("max_output_channels", 0) or 0
+        if not (ins or outs):
+            continue
         name = (d.get("name") or "")
         lname = name.lower()
-        if outs > 0 and first_out is None:
-            first_out, first_name = i, name
-        if outs > 0 and any(k in lname for k in ("hifiberry","snd_rpi_hifiberry","pcm512","pcm510","es9023","i2s","dac")):
-            hat_idx, hat_name = i, name
-        if outs > 0 and ("pulse" in lname or lname in ("default","sysdefault")):
-            pulse_idx, pulse_name = i, name
-    if hat_idx is not None:  return hat_idx, hat_name
-    if pulse_idx is not None: return pulse_idx, pulse_name
-    return first_out, first_name
+        if ins > 0:
+            if first_in is None:
+                first_in, first_in_name = i, name
+            if "umik" in lname:
+                umik_idx, umik_name = i, name
+        if outs > 0:
+            if first_out is None:
+                first_out, first_out_name = i, name
+            if _HAT_RE.search(lname):
+                hat_idx, hat_name = i, name
+            if "pulse" in lname or lname in _PULSE_NAMES:
+                pulse_idx, pulse_name = i, name
+    if umik_idx is not None: in_idx, in_name = umik_idx, umik_name
+    else:                    in_idx, in_name = first_in, first_in_name
+    if hat_idx is not None:     out_idx, out_name = hat_idx, hat_name
+    elif pulse_idx is not None: out_idx, out_name = pulse_idx, pulse_name
+    else:                       out_idx, out_name = first_out, first_out_name
+    return in_idx, in_name, out_idx, out_name
 
 def detect_hifiberry_alsa_fallback():
     """Return ALSA device string like 'hw:2,0' if HiFiBerry is present, else DEFAULT_ALSA."""
     try:
         out = subprocess.check_output(["aplay","-l"], text=True, stderr=subprocess.STDOUT)
-        # Find a line like: card 2: sndrpihifiberry [...], device 0:
-        card = dev = None
-        for ln in out.splitlines():
-            ln = ln.strip()
-            if "sndrpihifiberry" in ln or "HifiBerry" in ln or "hifiberry" in ln.lower():
-                # parse numbers
-                parts = ln.split()
-                # "card", "2:", ..., "device", "0:"
-                for i,p in enumerate(parts):
-                    if p == "card" and i+1 < len(parts):
-                        try: card = int(parts[i+1].rstrip(":"))
-                        except: pass
-                    if p == "device" and i+1 < len(parts):
-                        try: dev = int(parts[i+1].rstrip(":"))
-                        except: pass
-                break
-        if card is not None and dev is not None:
-            return f"hw:{card},{dev}"
+        m = _HIFIBERRY_RE.search(out)
+        if m:
+            return f"hw:{m.group(1)},{m.group(2)}"
     except Exception:
         pass
     return DEFAULT_ALSA
@@ -103,8 +106,7 @@ class MeasurelyGUI:
         self.root.title(APP_TITLE)
         self.root.geometry("980x620")
 
-        self.in_idx, self.in_name = pick_input_index()
-        self.out_idx, self.out_name = pick_output_index()
+        self.in_idx, self.in_name, self.out_idx, self.out_name = pick_devices()
         self.alsa_dev = detect_hifiberry_alsa_fallback()
         self.backend = tk.StringVar(value=DEFAULT_BACKEND)
         self.prepad  = tk.StringVar(value="0.5")
@@ -113,6 +115,7 @@ class MeasurelyGUI:
         self.dur     = tk.StringVar(value="8.0")
 
         self.last_saved_dir = None
+        self._pending_saved = None   # last "Saved:" path seen in the run log
 
         # Header
         hdr = ttk.Frame(root)
@@ -180,14 +183,16 @@ class MeasurelyGUI:
         self.root.after(100, self.drain_lines)
 
     def append_log(self, line):
+        if line.startswith("Saved:"):
+            self._pending_saved = line.split("Saved:",1)[1].strip()
         self.out_box.configure(state="normal")
         self.out_box.insert("end", line + "\n")
         self.out_box.see("end")
         self.out_box.configure(state="disabled")
 
     def rescan(self):
-        self.in_idx, self.in_name = pick_input_index()
-        self.out_idx, self.out_name = pick_output_index()
+        invalidate_device_cache()
+        self.in_idx, self.in_name, self.out_idx, self.out_name = pick_devices()
         self.in_lbl.config(text=f"{self.in_idx} – {self.in_name}")
         self.out_lbl.config(text=f"{self.out_idx} – {self.out_name}")
         self.alsa_dev = detect_hifiberry_alsa_fallback()
@@ -223,6 +228,7 @@ class MeasurelyGUI:
         self.out_box.configure(state="normal")
         self.out_box.delete("1.0", "end")
         self.out_box.configure(state="disabled")
+        self._pending_saved = None
 
         cmd = self.build_cmd()
         self.append_log(f"[cmd] {' '.join(cmd)}")
@@ -238,12 +244,8 @@ class MeasurelyGUI:
                     rc = self.worker.rc if self.worker else -1
                     self.status.set("Done" if rc == 0 else f"Error (rc={rc})")
                     self.run_btn.config(state="normal")
-                    # parse Saved: path from the captured output in the box
-                    text = self.out_box.get("1.0", "end")
-                    saved = None
-                    for ln in text.splitlines():
-                        if ln.startswith("Saved:"):
-                            saved = ln.split("Saved:",1)[1].strip()
+                    # Saved: path as picked up by append_log during the run
+                    saved = self._pending_saved
                     if saved and os.path.isdir(saved):
                         self.last_saved_dir = saved
                         self.open_btn.config(state="normal")
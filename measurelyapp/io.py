@@ -1,19 +1,40 @@
 """Load CSV / WAV / session folder."""
+from io import StringIO
 from pathlib import Path
-import csv, soundfile as sf, numpy as np
+import csv, os, soundfile as sf, numpy as np
 
 __all__ = ["load_response_csv", "load_ir", "load_session"]
 
-def load_response_csv(p: Path):
+def _parse_response_rows(text: str):
+    # tolerant per-row parser: skips headers / malformed rows anywhere
     freq, mag = [], []
-    for row in csv.reader(p.read_text().splitlines()):
+    for row in csv.reader(text.splitlines()):
         if len(row) >= 2:
             try:
                 freq.append(float(row[0]))
                 mag.append(float(row[1]))
             except ValueError:
                 pass
-    freq, mag = np.asarray(freq, dtype=float), np.asarray(mag, dtype=float)
+    return np.asarray(freq, dtype=float), np.asarray(mag, dtype=float)
+
+def load_response_csv(p: Path):
+    text = p.read_text()
+    # well-formed files (what sweep.py writes: optional header + freq,mag rows)
+    # go through numpy's C parser; anything it rejects gets the tolerant one
+    first, _, rest = text.partition("\n")
+    try:
+        float(first.split(",", 1)[0])
+        skip = 0
+    except ValueError:
+        skip = 1
+    try:
+        if not (rest.strip() if skip else text.strip()):
+            raise ValueError("no data rows")
+        arr = np.loadtxt(StringIO(text), delimiter=",", skiprows=skip, usecols=(0, 1),
+                         dtype=float, comments=None, ndmin=2)
+        freq, mag = arr[:, 0], arr[:, 1]
+    except ValueError:
+        freq, mag = _parse_response_rows(text)
     ok = np.isfinite(freq) & np.isfinite(mag) & (freq > 0)
     return freq[ok], mag[ok]
 
@@ -24,19 +45,25 @@ def load_ir(p: Path):
     ir = np.nan_to_num(ir, nan=0.0, posinf=0.0, neginf=0.0)
     return ir, fs
 
+def _entries(d: Path):
+    """Names in d from one directory read (empty set if d is missing)."""
+    try:
+        with os.scandir(d) as it:
+            return {e.name for e in it}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+
 def load_session(session_dir: Path):
     """Return freq, mag, ir, fs, label  (label='root'|'left'|'right'|'merged')."""
-    resp = session_dir / "response.csv"
-    imp  = session_dir / "impulse.wav"
-    if resp.exists() and imp.exists():
-        return *load_response_csv(resp), *load_ir(imp), "root"
+    # one scandir per folder instead of an exists() stat per candidate file
+    names = _entries(session_dir)
+    if {"response.csv", "impulse.wav"} <= names:
+        return *load_response_csv(session_dir / "response.csv"), *load_ir(session_dir / "impulse.wav"), "root"
 
     chans = {}
     for ch in ("left", "right"):
-        r = session_dir / ch / "response.csv"
-        i = session_dir / ch / "impulse.wav"
-        if r.exists() and i.exists():
-            chans[ch] = (r, i)
+        if ch in names and {"response.csv", "impulse.wav"} <= _entries(session_dir / ch):
+            chans[ch] = (session_dir / ch / "response.csv", session_dir / ch / "impulse.wav")
     if not chans:
         raise FileNotFoundError("No response.csv + impulse.wav found")
 
@@ -2,17 +2,20 @@
 """
 Measurely – main orchestrator
 - Picks playback backend (aplay/pa) via a tiny factory
-- Runs capture sweep (measurely.sweep), then analysis (measurely.analyse)
+- Runs capture sweep (measurely.sweep), then analysis (measurelyapp.analyse, in-process)
 - Echoes the sweep's stdout (so the "Saved: <dir>" line is preserved)
 - After analysis, prints a plain-English summary + simple fixes
 
 Extras:
 - --speaker support to load a profile from ~/measurely/speakers/speakers.json
 - Forwards safe sweep bounds/levels to measurely.sweep
-- Passes target curve CSV to measurely.analyse
+- Passes the speaker profile key to the analysis
 """
 
-import argparse, subprocess, sys, os, shlex, json
+import argparse, subprocess, sys, os, re, shlex, json
+
+# the capture's "Saved: <dir>" line
+_SAVED_RE = re.compile(r"^Saved:(.*)$", re.M)
 
 # --- speaker profiles ---
 def _repo_root():
@@ -133,53 +136,43 @@ def main():
 
     if args.dry_run:
         print("Would run capture:\n ", shlex.join(sweep_cmd))
-        print("Then run analyse on the Saved: directory found in capture output with:")
-        ana_preview = [sys.executable, "-m", "measurely.analyse", "<session_dir>",
-                       "--points-per-oct", str(args.points_per_oct)]
-        if speaker and speaker.get("_target_csv_abs"):
-            ana_preview += ["--target-csv", speaker["_target_csv_abs"]]
-        print(" ", shlex.join(ana_preview))
+        print("Then analyse (in-process) the Saved: directory found in capture output with:")
+        print(f"  ppo={args.points_per_oct} speaker={args.speaker}")
         sys.exit(0)
 
     # ----- Run capture and surface its stdout (incl. Saved: ...) -----
+    # Stream it line by line rather than buffering the whole verbose log:
+    # the UI sees progress live, and the Saved: line is picked up as it
+    # passes. stderr goes straight through to ours.
     print("Running capture…", flush=True)
-    cap = subprocess.run(sweep_cmd, text=True, capture_output=True)
-    # Echo stdout/stderr from sweep so the UI can show logs and parse "Saved:"
-    if cap.stdout:
-        print(cap.stdout, end="" if cap.stdout.endswith("\n") else "\n", flush=True)
+    saved_dir = None
+    with subprocess.Popen(sweep_cmd, text=True, stdout=subprocess.PIPE, bufsize=1,
+                          env={**os.environ, "PYTHONUNBUFFERED": "1"}) as cap:
+        for line in cap.stdout:
+            print(line, end="" if line.endswith("\n") else "\n", flush=True)
+            if saved_dir is None:
+                m = _SAVED_RE.match(line)
+                if m:
+                    saved_dir = m.group(1).strip()
     if cap.returncode != 0:
-        if cap.stderr:
-            _print_err(cap.stderr)
         sys.exit(cap.returncode)
 
-    # Parse Saved: path from capture stdout
-    saved_dir = None
-    for line in (cap.stdout or "").splitlines():
-        if line.startswith("Saved:"):
-            saved_dir = line.split("Saved:", 1)[1].strip()
-            break
     if not saved_dir or not os.path.isdir(saved_dir):
         _print_err("Could not locate Saved: directory in capture output.")
         sys.exit(2)
 
     # ----- Run analysis on that session directory -----
+    # In-process: the capture needs its own process for the audio device,
+    # but analysis is plain numpy -- no second interpreter start + imports.
+    # Its log lines go to our stderr, which the GUI merges into the pane.
     print("Running analysis…", flush=True)
-    analyse_cmd = [
-        sys.executable, "-m", "measurely.analyse", saved_dir,
-        "--points-per-oct", str(args.points_per_oct),
-    ]
-    # Forward target curve if present
-    if speaker and speaker.get("_target_csv_abs"):
-        analyse_cmd += ["--target-csv", speaker["_target_csv_abs"]]
-
-    ana = subprocess.run(analyse_cmd, text=True, capture_output=True)
-    # Surface analysis logs (so UI shows them too)
-    if ana.stdout:
-        print(ana.stdout, end="" if ana.stdout.endswith("\n") else "\n", flush=True)
-    if ana.returncode != 0:
-        if ana.stderr:
-            _print_err(ana.stderr)
-        sys.exit(ana.returncode)
+    from pathlib import Path
+    from measurelyapp.analyse import analyse
+    try:
+        analyse(Path(saved_dir), ppo=args.points_per_oct, speaker_key=args.speaker)
+    except Exception as e:
+        _print_err(f"[analyse] {e}")
+        sys.exit(1)
 
     # ----- Print a plain-English digest for the UI log pane -----
     analysis = _read_analysis_json(saved_dir)
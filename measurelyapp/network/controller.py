@@ -1,14 +1,16 @@
 import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from . import ap, sta
 from .util import run, try_run
 
-from .util import get_wifi_iface
-
 NETWORK_ENABLED = False
 
+# Resolved once by sta at import; avoids re-probing `iw dev` per status poll
+IFACE = sta.IFACE
+
 SERVICE_ROOT = Path(__file__).resolve().parents[1]
 STATE_DIR = str(SERVICE_ROOT / "state")
 ONBOARDING_FILE = os.path.join(STATE_DIR, "onboarding.json")
@@ -67,8 +69,7 @@ def scan():
 
 
 def _get_ip():
-    iface = get_wifi_iface()
-    out = try_run(f"ip -4 addr show dev {iface}")
+    out = try_run(f"ip -4 addr show dev {IFACE}")
     for line in out.splitlines():
         line = line.strip()
         if line.startswith("inet "):
@@ -77,12 +78,17 @@ def _get_ip():
 
 
 def status():
-    connected = bool(getattr(sta, "has_internet")() if hasattr(sta, "has_internet") else False)
+    # Route and address probes are independent forks – run them side by side
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        net = ex.submit(sta.has_internet) if hasattr(sta, "has_internet") else None
+        ip = ex.submit(_get_ip)
+        connected = bool(net.result()) if net else False
+
     mode = "sta" if connected else "ap"
     return {
         "mode": mode,
         "connected": connected,
-        "ip": _get_ip()
+        "ip": ip.result()
     }
 
 def init_network_on_boot():
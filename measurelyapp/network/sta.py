@@ -1,3 +1,4 @@
+import re
 import time
 from .util import run, try_run
 from .util import get_wifi_iface
@@ -59,65 +60,50 @@ def connect(ssid, psk, timeout=25):
     return False
 
 
+# One pass over `iw dev <iface> scan` output: BSS headers, SSID and signal lines
+_SCAN_RE = re.compile(
+    r"^(?:(?P<bss>BSS )|[ \t]*SSID:(?P<ssid>.*)|[ \t]*signal:[ \t]*(?P<signal>-?\d+(?:\.\d+)?))",
+    re.M,
+)
+
+
+def _signal_pct(signal_dbm):
+    if signal_dbm is None:
+        return None
+    return int(max(0, min(100, 2 * (signal_dbm + 100))))
+
+
 def scan():
     print(f"[SCAN] Running: iw dev {IFACE} scan")
     out = run(f"iw dev {IFACE} scan", check=False)
 
     print(f"[SCAN] Raw output length: {len(out)}")
 
-    nets = []
+    # Deduplicate by SSID as we go, keeping the strongest signal
+    best = {}
+
+    def commit(ssid, signal_dbm):
+        if not ssid:
+            return
+        sig = _signal_pct(signal_dbm)
+        cur = best.get(ssid)
+        if cur is None or (sig is not None and (cur["signal"] is None or sig > cur["signal"])):
+            best[ssid] = {"ssid": ssid, "signal": sig}
+
     ssid = None
     signal_dbm = None
 
-    for line in out.splitlines():
-        line = line.strip()
-
-        if line.startswith("BSS "):
-            if ssid:
-                sig = None
-                if signal_dbm is not None:
-                    sig = int(max(0, min(100, 2 * (signal_dbm + 100))))
-                print(f"[SCAN] Commit BSS: ssid='{ssid}', signal_dbm={signal_dbm}, signal={sig}")
-                nets.append({"ssid": ssid, "signal": sig})
+    for m in _SCAN_RE.finditer(out):
+        if m.group("bss"):
+            commit(ssid, signal_dbm)
             ssid = None
             signal_dbm = None
-            continue
-
-        if line.startswith("SSID:"):
-            ssid = line.split("SSID:", 1)[1].strip() or None
-            print(f"[SCAN] Found SSID: {ssid}")
-            continue
-
-        if line.startswith("signal:"):
-            try:
-                signal_dbm = float(line.split("signal:", 1)[1].strip().split()[0])
-                print(f"[SCAN] Signal dBm: {signal_dbm}")
-            except Exception:
-                print("[SCAN] Failed to parse signal line:", line)
-                signal_dbm = None
-            continue
-
-    if ssid:
-        sig = None
-        if signal_dbm is not None:
-            sig = int(max(0, min(100, 2 * (signal_dbm + 100))))
-        print(f"[SCAN] Commit FINAL BSS: ssid='{ssid}', signal_dbm={signal_dbm}, signal={sig}")
-        nets.append({"ssid": ssid, "signal": sig})
-
-    print(f"[SCAN] Parsed BSS entries (pre-dedupe): {len(nets)}")
-
-    best = {}
-    for n in nets:
-        s = n.get("ssid")
-        if not s:
-            continue
-        if s not in best:
-            best[s] = n
+        elif m.group("ssid") is not None:
+            ssid = m.group("ssid").strip() or None
         else:
-            a = best[s].get("signal")
-            b = n.get("signal")
-            if b is not None and (a is None or b > a):
-                best[s] = n
+            signal_dbm = float(m.group("signal"))
+
+    commit(ssid, signal_dbm)
 
     result = sorted(
         best.values(),
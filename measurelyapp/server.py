@@ -26,7 +26,6 @@ import random
 import math
 import traceback
 import numpy as np
-import sounddevice as sd
 from datetime import datetime
 from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
@@ -34,6 +33,7 @@ from scipy.ndimage import gaussian_filter1d
 
 from measurelyapp.network.api import network_api
 from measurelyapp.network import controller
+from measurelyapp.util_io import meta_lock
 from history import build_sweephistory
 
 import os
@@ -67,25 +67,49 @@ def play_startup_sound():
     except Exception as e:
         print("⚠️ Failed to play startup sound:", e)
 
-try:
-    sd._initialize()
-    print("✓ PortAudio initialised once at startup")
-except Exception as e:
-    print("❌ PortAudio init failed at startup:", e)
+# ------------------------------------------------------------------
+#  Audio devices (PortAudio is initialised lazily, off the request path)
+# ------------------------------------------------------------------
+DEVICE_CACHE_TTL = 5.0
+_device_cache = {"t": 0.0, "devices": None}
+_device_lock = threading.Lock()
+
+
+def detect_devices():
+    """return sd.query_devices(), cached for DEVICE_CACHE_TTL seconds"""
+    with _device_lock:
+        now = time.monotonic()
+        if _device_cache["devices"] is not None and now - _device_cache["t"] < DEVICE_CACHE_TTL:
+            return _device_cache["devices"]
 
+        # importing sounddevice initialises PortAudio (probes every ALSA card)
+        import sounddevice as sd
+        devices = sd.query_devices()
+        _device_cache["t"] = now
+        _device_cache["devices"] = devices
+        return devices
+
+
+def warm_up_devices():
+    try:
+        detect_devices()
+        print("✓ PortAudio initialised in background")
+    except Exception as e:
+        print("❌ PortAudio init failed at startup:", e)
+
+
+threading.Thread(target=warm_up_devices, daemon=True).start()
 threading.Thread(target=play_startup_sound, daemon=True).start()
 
 
 def cancel_sweep():
     global SWEEP_CANCELLED
     SWEEP_CANCELLED = True
-    try:
-        sd.stop()  # Immediately halt playback/recording
-    except Exception:
-        pass
+    force_stop_audio()  # Immediately halt playback/recording
 
 def force_stop_audio():
     try:
+        import sounddevice as sd
         sd.stop()
     except Exception:
         pass
@@ -219,6 +243,39 @@ def write_json_atomic(obj, dest: Path):
     tmp.write_text(json.dumps(obj, ensure_ascii=False, indent=2), encoding='utf-8')
     os.replace(tmp, dest)
 
+# ------------------------------------------------------------------
+#  global room.json – write-through memory cache
+# ------------------------------------------------------------------
+ROOM_FILE = SERVICE_ROOT / "room.json"
+_room_cache = {"mtime": None, "room": None}
+_room_lock = threading.RLock()
+
+def read_room_config():
+    """return room.json (or None), re-parsed only when the file's mtime changes.
+    Callers must treat the returned dict as read-only."""
+    with _room_lock:
+        try:
+            mtime = ROOM_FILE.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if _room_cache["mtime"] != mtime:
+            _room_cache["room"] = json.loads(ROOM_FILE.read_text(encoding='utf-8'))
+            _room_cache["mtime"] = mtime
+        return _room_cache["room"]
+
+def write_room_config(room):
+    """persist room.json only if it differs from the cached copy; returns True if written"""
+    with _room_lock:
+        try:
+            if read_room_config() == room:
+                return False
+        except Exception:
+            pass
+        write_json_atomic(room, ROOM_FILE)
+        _room_cache["room"] = room
+        _room_cache["mtime"] = ROOM_FILE.stat().st_mtime_ns
+        return True
+
 def _smooth(arr, sigma):
     """light Gaussian 1-D smooth"""
     if len(arr) <= 1 or sigma <= 0:
@@ -556,14 +613,15 @@ def update_session_note(session_id):
         payload = request.get_json(force=True) or {}
         note = payload.get("note", "").strip()
 
-        # Load existing meta
-        meta = json.loads(meta_file.read_text(encoding='utf-8'))
+        with meta_lock(meta_file):
+            # Load existing meta
+            meta = json.loads(meta_file.read_text(encoding='utf-8'))
 
-        # Update meta with notes field
-        meta["notes"] = note
+            # Update meta with notes field
+            meta["notes"] = note
 
-        # Save atomically
-        write_json_atomic(meta, meta_file)
+            # Save atomically
+            write_json_atomic(meta, meta_file)
 
         print(f"[NOTE SAVED] {session_id}: {note}")
 
@@ -580,7 +638,7 @@ def update_session_note(session_id):
 # ------------------------------------------------------------------
 @app.route('/api/run-sweep', methods=['POST'])
 def run_sweep():
-    import subprocess, traceback, sounddevice as sd
+    import subprocess, traceback
     import threading, os, time, json
 
     try:
@@ -600,7 +658,7 @@ def run_sweep():
             os.remove(status_file)
 
         # Detect audio devices
-        devices = sd.query_devices()
+        devices = detect_devices()
         input_devices = [(i, d['name']) for i, d in enumerate(devices)
                          if "usb" in d['name'].lower() and d['max_input_channels'] > 0]
         output_devices = [(i, d['name']) for i, d in enumerate(devices)
@@ -737,15 +795,15 @@ def run_sweep():
             # -----------------------------
             try:
                 latest = MEAS_ROOT / "latest"
-                room_file = SERVICE_ROOT / "room.json"
+                room_data = read_room_config()
 
-                if room_file.exists():
-                    room_data = json.loads(room_file.read_text())
+                if room_data is not None:
                     meta_file = latest / "meta.json"
-                    meta = json.loads(meta_file.read_text()) if meta_file.exists() else {}
-                    meta.setdefault("settings", {})
-                    meta["settings"]["room"] = room_data
-                    write_json_atomic(meta, meta_file)
+                    with meta_lock(meta_file):
+                        meta = json.loads(meta_file.read_text()) if meta_file.exists() else {}
+                        meta.setdefault("settings", {})
+                        meta["settings"]["room"] = room_data
+                        write_json_atomic(meta, meta_file)
                     print("✓ Room data restored")
             except Exception as e:
                 print("Room restore failed:", e)
@@ -816,7 +874,7 @@ def get_status():
 
     try:
 
-        devices = sd.query_devices()
+        devices = detect_devices()
 
         # Detect USB Mic
         usb_mics = [
@@ -1132,13 +1190,11 @@ def api_speakers():
 
         # Fallback to room.json
         if not current_key:
-            room_file = SERVICE_ROOT / "room.json"
-            if room_file.exists():
-                try:
-                    room_data = json.loads(room_file.read_text())
-                    current_key = room_data.get("speaker_key")
-                except Exception:
-                    pass
+            try:
+                room_data = read_room_config() or {}
+                current_key = room_data.get("speaker_key")
+            except Exception:
+                pass
 
         # Final fallback: use first entry in catalogue
         if not current_key and speakers:
@@ -1206,17 +1262,22 @@ def save_room():
         data = request.get_json(force=True)
         print("📥 Received room data:", data)
 
-        # --- UPDATE latest/meta.json ---
+        # --- UPDATE latest/meta.json (skip the write if nothing changed) ---
         meta_file = ses / "meta.json"
-        meta = json.loads(meta_file.read_text(encoding='utf-8')) if meta_file.exists() else {}
-        meta.setdefault("settings", {})
-        meta["settings"].setdefault("room", {})
-        meta["settings"]["room"].update(data)
-        write_json_atomic(meta, meta_file)
+        with meta_lock(meta_file):
+            meta = json.loads(meta_file.read_text(encoding='utf-8')) if meta_file.exists() else {}
+            meta.setdefault("settings", {})
+            room = meta["settings"].setdefault("room", {})
+            meta_changed = any(room.get(k) != v for k, v in data.items())
+            if meta_changed:
+                room.update(data)
+                write_json_atomic(meta, meta_file)
 
         # --- UPDATE GLOBAL room.json ---
-        room_file = SERVICE_ROOT / "room.json"
-        write_json_atomic(data, room_file)
+        room_changed = write_room_config(data)
+
+        if not (meta_changed or room_changed):
+            return jsonify({"status": "nochange"})
 
         return jsonify({"status": "saved"})
 
@@ -1242,9 +1303,7 @@ def load_room():
 
         # 2) Fallback to persistent global room.json
         if not room:
-            room_file = SERVICE_ROOT / "room.json"
-            if room_file.exists():
-                room = json.loads(room_file.read_text(encoding='utf-8')) or {}
+            room = read_room_config() or {}
 
         # Always return an object (never None)
         return jsonify(room if isinstance(room, dict) else {}), 200
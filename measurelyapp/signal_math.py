@@ -2,31 +2,77 @@
 import numpy as np
 
 __all__ = [
-    "log_bins", "band_mean", "modes", "bandwidth_3db", "smoothness",
+    "log_bins", "band_mean", "band_means", "bins_per_octave", "modes", "bandwidth_3db", "smoothness",
     "early_reflections", "rt60_edt",
 ]
 
+def _boxcar_same(x, w):
+    """np.convolve(x, ones(w)/w, mode="same") from one prefix sum: O(N), not O(N*w).
+    Zero-padded edges like convolve; non-finite input (where a running sum
+    would smear a NaN over everything after it) goes through convolve."""
+    x = np.asarray(x, dtype=float)
+    n = x.size
+    if w > n or not np.isfinite(x).all():
+        return np.convolve(x, np.ones(w) / w, mode="same")
+    c = np.concatenate(([0.0], np.cumsum(x)))
+    i = np.arange(n)
+    lo = np.maximum(i - w // 2, 0)
+    hi = np.minimum(i + (w - 1) // 2 + 1, n)
+    return (c[hi] - c[lo]) / w
+
 def log_bins(f, m, fmin=20, fmax=20e3, ppo=48):
     f, m = np.asarray(f), np.asarray(m)
     mask = (f >= fmin) & (f <= fmax) & np.isfinite(m)
     f, m = f[mask], m[mask]
     if f.size < 8:
         return f, m
-    edges = fmin * (2 ** (np.arange(int(np.ceil(np.log2(fmax/fmin) * ppo) + 1)) / ppo))
-    idx   = np.digitize(f, edges) - 1
-    sums  = np.bincount(idx, weights=m, minlength=len(edges))
-    cnts  = np.bincount(idx, minlength=len(edges))
+    n_bins = int(np.ceil(np.log2(fmax / fmin) * ppo))
+    lo2 = np.log2(fmin)
+    edges = np.logspace(lo2, lo2 + n_bins / ppo, n_bins + 1, base=2.0)
+    if np.any(f[1:] < f[:-1]):
+        order = np.argsort(f, kind="stable")
+        f, m = f[order], m[order]
+    # f is ascending, so each bin is a contiguous run: its bounds are one
+    # searchsorted and its sum one sequential reduceat (no scatter bincount)
+    bounds = np.searchsorted(f, edges, side="left")
+    cnts  = np.diff(bounds)
+    sums  = np.add.reduceat(np.append(m, 0.0), bounds)[:-1]   # pad: a bound may be len(f)
     with np.errstate(invalid="ignore", divide="ignore"):
         m_avg = sums / np.maximum(cnts, 1)
     centres = np.sqrt(edges[:-1] * edges[1:])
-    use = cnts[:-1] > 0
-    return centres[use], m_avg[:-1][use]
+    use = cnts > 0
+    return centres[use], m_avg[use]
 
 def band_mean(f, m, flo, fhi):
     mask = (f >= flo) & (f < fhi)
     return float(np.nanmean(m[mask])) if mask.any() else np.nan
 
-def modes(f, m, thresh=4, min_sep=10):
+def band_means(f, m, edges):
+    """band_mean() over consecutive [edges[k], edges[k+1]) bands in one pass:
+    f must be ascending (log_bins output is), so the band limits are a single
+    searchsorted and the sums one reduceat."""
+    m = np.asarray(m, dtype=float)
+    idx = np.searchsorted(np.asarray(f), edges, side="left")
+    starts, stops = idx[:-1], idx[1:]
+    nan = np.isnan(m)
+    # reduce at every edge (the last segment, past the top edge, is dropped);
+    # one pad slot keeps an edge at len(m) a valid index
+    vals = np.append(np.where(nan, 0.0, m), 0.0)
+    sums = np.add.reduceat(vals, idx)[:-1]
+    cnts = (stops - starts) - np.add.reduceat(np.append(nan, False), idx)[:-1]
+    cnts = np.where(stops > starts, cnts, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(cnts > 0, sums / np.maximum(cnts, 1), np.nan)
+    return [float(v) for v in means]
+
+def bins_per_octave(f):
+    """Median bins per octave of a log-spaced axis (inf/negative if it isn't).
+    modes() and smoothness() both need it -- compute once, pass bpo= to each."""
+    f = np.asarray(f)
+    with np.errstate(divide="ignore"):
+        return 1.0 / np.median(np.log2(f[1:] / f[:-1]))
+
+def modes(f, m, thresh=4, min_sep=10, bpo=None):
     """Peak/dip finder that works on low-resolution or binned data.
        Adaptive window, safe even when PPO < 20.
     """
@@ -37,33 +83,33 @@ def modes(f, m, thresh=4, min_sep=10):
         return []
 
     # Estimate bins per octave (bpo)
-    ratios = f[1:] / f[:-1]
-    log_steps = np.log2(ratios)
-    median_step = np.median(log_steps)
-    if median_step <= 0:
+    if bpo is None:
+        bpo = bins_per_octave(f)
+    if not (0 < bpo < np.inf):
         return []
 
-    bpo = 1.0 / median_step
-
     # Adaptive smoother:
     # - if bpo is small (<24 PPO), don't blur too much
     # - if bpo is large (raw data), smooth more
     win = max(3, int(round(bpo / 4)))
 
-    base = np.convolve(m, np.ones(win) / win, mode="same")
+    base = _boxcar_same(m, win)
     delta = m - base
 
     out = []
     last = -np.inf
 
-    for i, d in enumerate(delta):
-        if abs(d) >= thresh and (f[i] - last) >= min_sep:
+    # threshold test in one pass; only the few survivors see the spacing loop
+    with np.errstate(invalid="ignore"):
+        cand = np.flatnonzero(np.abs(delta) >= thresh)
+    for fi, d in zip(f[cand].tolist(), delta[cand].tolist()):
+        if fi - last >= min_sep:
             out.append({
                 "type": "peak" if d > 0 else "dip",
-                "freq_hz": float(f[i]),
-                "delta_db": float(d)
+                "freq_hz": fi,
+                "delta_db": d
             })
-            last = f[i]
+            last = fi
 
     return out
 
@@ -90,52 +136,73 @@ def apply_mic_calibration(f, m, mic_type="omnitronic_mm2"):
 def bandwidth_3db(f, m):
     if f.size < 8:
         return None, None
-    ref = np.nanmedian(m[(f >= 500) & (f <= 2000)]) if np.any((f >= 500) & (f <= 2000)) else np.nanmedian(m)
-    tgt = ref - 3
-    lo  = next((f[i] for i in range(f.size) if m[i] >= tgt), None)
-    hi  = next((f[i] for i in range(f.size-1, -1, -1) if m[i] >= tgt), None)
-    return lo, hi
-
-def smoothness(f, m):
-    bpo = 1 / np.median(np.log2(f[1:] / f[:-1]))
+    mid = (f >= 500) & (f <= 2000)
+    ref = np.nanmedian(m[mid]) if mid.any() else np.nanmedian(m)
+    ok  = m >= ref - 3
+    if not ok.any():
+        return None, None
+    return f[int(np.argmax(ok))], f[ok.size - 1 - int(np.argmax(ok[::-1]))]
+
+def smoothness(f, m, bpo=None):
+    if bpo is None:
+        bpo = bins_per_octave(f)
     win = max(3, int(round(bpo / 3)))
-    base = np.convolve(m, np.ones(win)/win, mode="same")
+    base = _boxcar_same(m, win)
     return float(np.nanstd(m - base))
 
+def abs_argmax(x):
+    """argmax(|x|) from one argmax and one argmin -- no |x| temporary."""
+    hi = int(np.argmax(x))
+    lo = int(np.argmin(x))
+    return hi if x[hi] >= -x[lo] else lo
+
 def early_reflections(ir, fs, win_ms=20, db_rel=-20):
     if ir.size == 0:
         return []
-    idx0 = int(np.argmax(np.abs(ir)))
-    peak = float(np.abs(ir[idx0]))
+    idx0 = abs_argmax(ir)
+    peak = abs(float(ir[idx0]))
     thr  = peak * 10**(db_rel/20)
     end  = min(ir.size, idx0 + int(fs * win_ms / 1000))
+    # local maxima above thr as one vectorised mask; only the few survivors
+    # go through the (sequential) 0.3 ms spacing rule
+    a  = np.abs(ir[idx0:end])
+    c  = a[1:-1]
+    pk = np.flatnonzero((c >= thr) & (c > a[:-2]) & (c >= a[2:])) + 1
     times = []
-    for i in range(idx0+1, end-1):
-        a = np.abs(ir[i])
-        if a >= thr and a > np.abs(ir[i-1]) and a >= np.abs(ir[i+1]):
-            t = (i-idx0)*1000/fs
-            if not times or t - times[-1] > 0.3:
-                times.append(round(t, 2))
+    for j in pk.tolist():
+        t = j*1000/fs
+        if not times or t - times[-1] > 0.3:
+            times.append(round(t, 2))
     return times
 
 def rt60_edt(ir, fs, max_win=1.5):
     if ir.size < int(0.1*fs):
         return {"rt60": None, "method": None, "edt": None}
-    idx0 = int(np.argmax(np.abs(ir)))
+    idx0 = abs_argmax(ir)
     end  = min(ir.size, idx0 + int(fs*max_win))
-    y    = ir[idx0:end].astype(np.float64)
-    e    = y*y
-    edc  = np.cumsum(e[::-1])[::-1]
-    edc  = edc / (edc[0] + 1e-18)
-    edb  = 10*np.log10(np.maximum(edc, 1e-18))
+    # Schroeder integral -> dB in one float32 buffer (the IR is loaded as
+    # float32; squared it still spans far more than the 60 dB we fit):
+    # square, reverse cumsum, normalise, clamp, log all write back in place
+    edb  = np.square(ir[idx0:end], dtype=np.float32)
+    np.cumsum(edb[::-1], out=edb[::-1])
+    edb /= edb[0] + np.float32(1e-18)
+    np.maximum(edb, np.float32(1e-18), out=edb)
+    np.log10(edb, out=edb)
+    edb *= 10
     t    = np.arange(edb.size)/fs
 
+    # The Schroeder curve never rises, so each "lo >= edb >= hi" range is one
+    # contiguous slice (two binary searches, no masks) and its straight-line
+    # fit is the closed-form least-squares slope rather than an SVD solve.
+    neg = -edb
+
     def slope(lo, hi):
-        mask = (edb <= lo) & (edb >= hi)
-        if mask.sum() < max(10, int(0.1*fs)):
+        i0 = int(np.searchsorted(neg, -lo, side="left"))
+        i1 = int(np.searchsorted(neg, -hi, side="right"))
+        if i1 - i0 < max(10, int(0.1*fs)):
             return None
-        A = np.vstack([t[mask], np.ones(mask.sum())]).T
-        return np.linalg.lstsq(A, edb[mask], rcond=None)[0][0]
+        x = t[i0:i1] - t[i0:i1].mean()
+        return float(np.dot(x, edb[i0:i1]) / np.dot(x, x))
 
     edt = None
     s   = slope(0, -10)
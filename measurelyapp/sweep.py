@@ -14,19 +14,28 @@ measurely – headless sweep runner (SSH-friendly, atomic writes)
 - Verbose SSH-friendly logging with --verbose flag.
 """
 
-import os, sys, json, uuid, argparse, subprocess, shutil, tempfile, signal, time
+import os, sys, json, uuid, argparse, subprocess, shutil, signal, time, threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
 
 import numpy as np
 import sounddevice as sd
 import soundfile as sf
-from scipy.signal import fftconvolve
+from scipy.fft import rfft, irfft, rfftfreq, next_fast_len
+
+from measurelyapp.util_io import (
+    _atomic_write_with, _atomic_write_bytes, batch_sync_available, sync_written,
+    meta_lock, write_json_atomic,
+)
+from measurelyapp.signal_math import abs_argmax
 
 # Headless-safe plotting
 import matplotlib
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from pathlib import Path
 
 SWEEP_OK = True
@@ -82,7 +91,9 @@ def write_session_meta(session_root, fs, args, speaker_key):
         "timestamp": datetime.now().isoformat(),
     }
 
-    write_json_atomic(meta, Path(session_root) / "meta.json")
+    meta_file = Path(session_root) / "meta.json"
+    with meta_lock(meta_file):
+        write_json_atomic(meta, meta_file)
 
 
 # ------------------------------------------------------------------
@@ -107,9 +118,21 @@ def session_dir() -> Path:
     return session_path
 
 
-def route_to_left(sweep):  return np.column_stack([sweep, np.zeros_like(sweep)])
-def route_to_right(sweep): return np.column_stack([np.zeros_like(sweep), sweep])
-def route_to_both(sweep):  return np.column_stack([sweep, sweep])
+def _route(sweep, cols):
+    # one (N,2) C-contiguous allocation, mono written into the driven column(s);
+    # no zeros_like + column_stack copy
+    sweep = np.asarray(sweep)
+    out = (np.empty if len(cols) == 2 else np.zeros)((sweep.shape[0], 2), dtype=sweep.dtype)
+    for c in cols:
+        out[:, c] = sweep
+    return out
+
+def route_to_left(sweep):  return _route(sweep, (0,))
+def route_to_right(sweep): return _route(sweep, (1,))
+def route_to_both(sweep):  return _route(sweep, (0, 1))
+
+# output columns each route drives (used by the streaming PortAudio path)
+ROUTE_COLUMNS = {route_to_left: (0,), route_to_right: (1,), route_to_both: (0, 1)}
 
 def write_log(outdir, lines):
     outdir = Path(outdir); outdir.mkdir(parents=True, exist_ok=True)
@@ -139,6 +162,11 @@ def dev_info(idx, kind=None):
     except Exception as e:
         return {"error": str(e), "index": idx, "kind": kind}
 
+def rms_of(x):
+    """RMS in one pass (dot product), no x**2 temporary."""
+    x = np.ravel(x)
+    return float(np.sqrt(np.dot(x, x) / x.size)) if x.size else 0.0
+
 def fail(outdir, e, where=""):
     write_log(outdir, f"FATAL{(' @'+where) if where else ''}: {e}")
     raise
@@ -147,41 +175,32 @@ def fail(outdir, e, where=""):
 # ------------------------------------------------------------------
 #  atomic file I/O
 # ------------------------------------------------------------------
-def _atomic_write_bytes(data: bytes, dest: Path):
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    with tempfile.NamedTemporaryFile(dir=str(dest.parent), delete=False) as tf:
-        tf.write(data); tf.flush(); os.fsync(tf.fileno())
-        os.replace(tf.name, dest)
-
-def write_text_atomic(text: str, dest: Path):
-    _atomic_write_bytes(text.encode("utf-8"), Path(dest))
-
-def write_json_atomic(obj, dest: Path):
-    payload = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
-    _atomic_write_bytes(payload, Path(dest))
-
-def savefig_atomic(fig, dest: Path, **kwargs):
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    tmp = tempfile.NamedTemporaryFile(dir=str(dest.parent), suffix=dest.suffix, delete=False).name
-    try:
-        fig.savefig(tmp, **kwargs)
-        with open(tmp, "rb") as rf: os.fsync(rf.fileno())
-        os.replace(tmp, dest)
-    finally:
-        try: os.unlink(tmp)
-        except FileNotFoundError: pass
-        plt.close(fig)
+# the atomic-write machinery (O_TMPFILE, batched syncfs) lives in util_io;
+# this module only adds the WAV / PNG encoders on top of it
 
-def write_wav_atomic(dest: Path, data, fs: int):
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    tmp = tempfile.NamedTemporaryFile(dir=str(dest.parent), suffix=".wav", delete=False).name
-    try:
-        sf.write(tmp, data, fs)
-        with open(tmp, "rb") as rf: os.fsync(rf.fileno())
-        os.replace(tmp, dest)
-    finally:
-        try: os.unlink(tmp)
-        except FileNotFoundError: pass
+# Recordings and the IR are stored as 16-bit PCM (half the bytes of float,
+# plenty for a measurement mic); the sweep reference stays float so it can
+# be reused bit-exactly. Keyed by save_all() target key.
+WAV_SUBTYPE_DEFAULT = "PCM_16"
+WAV_SUBTYPES = {"sweep": "FLOAT"}
+
+def write_wav_atomic(dest: Path, data, fs: int, subtype=WAV_SUBTYPE_DEFAULT):
+    _atomic_write_with(dest, lambda f: sf.write(f, data, fs, subtype=subtype, format="WAV"))
+
+def wav_bytes(data, fs: int, subtype=WAV_SUBTYPE_DEFAULT) -> bytes:
+    buf = BytesIO()
+    sf.write(buf, data, fs, subtype=subtype, format="WAV")
+    return buf.getvalue()
+
+def png_bytes(fig) -> bytes:
+    """
+    Render straight through the figure's Agg canvas at fig.dpi. Rasterise
+    once with this and write the bytes to every target -- never savefig
+    per target, which redraws the whole figure each time.
+    """
+    buf = BytesIO()
+    fig.canvas.print_png(buf)
+    return buf.getvalue()
 
 
 # ------------------------------------------------------------------
@@ -200,37 +219,205 @@ signal.signal(signal.SIGTERM, _graceful_stop)
 # ------------------------------------------------------------------
 #  DSP core
 # ------------------------------------------------------------------
+def _usable_cpus():
+    # honour taskset / cgroup pinning (e.g. audio threads isolated on a Pi),
+    # which os.cpu_count() ignores
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+DSP_WORKERS = _usable_cpus()
+
+SWEEP_BLOCK = 1 << 15   # samples per generator block (float64 scratch stays in L2)
+
 def gen_log_sweep(fs=48000, dur=8.0, f0=20.0, f1=20000.0):
-    t   = np.linspace(0, dur, int(fs * dur), endpoint=False, dtype=np.float64)
+    N   = int(fs * dur)
     K   = dur / np.log(f1 / f0)
-    phase = 2.0 * np.pi * f0 * K * (np.exp(t / K) - 1.0)
-    sweep = np.sin(phase).astype(np.float32)
-    sweep /= np.max(np.abs(sweep)) + 1e-12
-    sweep *= 0.7
-    inv   = (sweep[::-1] / np.exp(t / K)).astype(np.float32)
-    return sweep, inv
-
-def xcorr_peak_index(rec, ref):
-    c = fftconvolve(rec, ref[::-1], mode="full")
-    k = int(np.argmax(np.abs(c)))
-    return max(0, k - (len(ref) - 1))
+    t_scale     = dur / (N * K) if N else 0.0   # sample index -> t / K
+    phase_scale = 2.0 * np.pi * f0 * K
+    sweep = np.empty(N, dtype=np.float32)
+
+    # Phase runs up to ~1e5 rad, so it stays float64: at float32 the phase
+    # step near the top of the sweep is ~0.01 rad, which audibly smears 20 kHz.
+    # Range-reducing to float32 before sin() was measured slower, not faster.
+    # Each block builds it in place in one small scratch buffer; the float32
+    # result is written straight from the float64 ufunc loop via out=.
+    # numpy releases the GIL inside ufuncs, so blocks run on every core.
+    def block(lo):
+        hi = min(lo + SWEEP_BLOCK, N)
+        x = np.arange(lo, hi, dtype=np.float64)
+        x *= t_scale
+        np.expm1(x, out=x)                # exp(t/K) - 1
+        x *= phase_scale
+        np.sin(x, out=sweep[lo:hi], casting="same_kind")
+
+    starts = range(0, N, SWEEP_BLOCK)
+    workers = min(DSP_WORKERS, len(starts))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            list(ex.map(block, starts))
+    else:
+        for lo in starts:
+            block(lo)
+
+    peak = max(float(sweep.max()), -float(sweep.min())) if N else 0.0
+    sweep *= 0.7 / (peak + 1e-12)
+    return sweep
+
+# pocketfft threads over the transforms in a call; every FFT below passes
+# this so batched transforms use all cores (RPi4: 4). Spectra we own and
+# never read again are handed to irfft with overwrite_x=True so pocketfft
+# can use them as its scratch buffer instead of allocating another one.
+FFT_WORKERS = DSP_WORKERS
+
+XCORR_DECIM = 16            # coarse onset search runs at fs / XCORR_DECIM
+XCORR_MIN_PEAK_RATIO = 8.0  # coarse PHAT peak / RMS below this -> full-rate search
+
+def _block_mean(x, q):
+    """Cheap decimator for the onset search: mean of each q-sample block."""
+    m = (len(x) // q) * q
+    return x[:m].reshape(-1, q).mean(axis=1)
+
+def gen_log_sweep_with_spectra(fs=48000, dur=8.0, f0=20.0, f1=20000.0, max_rec_len=None, max_used_len=None):
+    """
+    Sweep plus the kernel spectra the DSP path needs:
+      n_fft / inv_f          : Farina inverse filter at one FFT size that keeps
+                               deconvolve's IR window alias-free for the longest
+                               trimmed segment (max_used_len) it sees
+      n_dec / sweep_rev_dec_phat: whitened, time-reversed, decimated sweep for the
+                                  coarse GCC-PHAT onset search over the whole recording
+    Everything here is computed once per session; per channel, the only large
+    transform pair left is deconvolve's rfft/irfft of the trimmed recording.
+    """
+    sweep = gen_log_sweep(fs, dur, f0, f1)
+    if max_rec_len is None:
+        max_rec_len = len(sweep)
+    if max_used_len is None:
+        max_used_len = max_rec_len
+    # Recording and sweep are always comparable in length (pads are a few
+    # seconds either side of a >=4 s sweep), so one long rfft beats
+    # overlap-add here -- and it lets the kernel spectra be cached.
+    # deconvolve() only keeps IR_WINDOW_S starting just before the direct
+    # peak, which lands ~len(sweep) into the linear convolution, so the
+    # transform need not hold all of it -- just enough that the wrapped-around
+    # tail ends before that window (>= used + pre-roll) and the window ends
+    # inside the buffer (>= len(sweep) + window). Extra pre-roll is slack.
+    pre = int(IR_PRE_ROLL_S * fs)
+    n_lin = len(sweep) + int(max_used_len) - 1
+    n_fft = next_fast_len(min(n_lin, max(int(max_used_len), len(sweep) + int(IR_WINDOW_S * fs)) + 2 * pre),
+                          real=True)
+
+    sweep_dec = _block_mean(sweep, XCORR_DECIM)
+    n_dec = next_fast_len(int(max_rec_len) // XCORR_DECIM + len(sweep_dec) - 1, real=True)
+    # GCC-PHAT: the reference half of the whitening is fixed, so do it here.
+    # Bins where the sweep has no energy are zeroed rather than amplified.
+    S = rfft(sweep_dec[::-1], n_dec, workers=FFT_WORKERS)
+    S_mag = np.abs(S)
+    S_phat = np.where(S_mag > 1e-3 * S_mag.max(), S / np.maximum(S_mag, 1e-30), 0).astype(np.complex64)
+
+    # Farina inverse = time-reversed sweep with its pink (-3 dB/oct) spectrum
+    # flattened. The classic exp(-t/K) time envelope equals f/f1 at each
+    # instant, so apply it as an f/f1 ramp on the spectrum we cache anyway
+    # instead of a full-length exp + multiply in the time domain.
+    # Stacked so one batched irfft gives both the matched-filter xcorr
+    # (row 0, onset refinement) and the Farina IR (row 1) -- see sweep_onset_and_ir().
+    ref_f = np.empty((2, n_fft // 2 + 1), dtype=np.complex64)
+    ref_f[0] = rfft(sweep[::-1], n_fft, workers=FFT_WORKERS)
+    np.multiply(ref_f[0], (rfftfreq(n_fft, 1.0 / float(fs)) / float(f1)).astype(np.float32), out=ref_f[1])
+
+    spectra = {
+        "n_fft": n_fft,
+        "ref_f": ref_f,
+        "inv_f": ref_f[1],
+        "n_dec": n_dec,
+        "sweep_rev_dec_phat": S_phat,
+    }
+    return sweep, spectra
+
+def _coarse_onset_index(rec, ref, spectra, q=XCORR_DECIM):
+    """
+    Approximate sweep onset (within ~q samples) from GCC-PHAT of the
+    q-decimated recording against the cached whitened decimated sweep --
+    phase-only, so LF rumble / mains hum can't drag the peak the way they
+    do in a plain xcorr.
+    """
+    nr = len(ref) // q
+    rec_dec = _block_mean(rec, q)
+    n_dec = spectra["n_dec"]
+    C = rfft(rec_dec, n_dec, workers=FFT_WORKERS)
+    C /= np.abs(C) + 1e-12
+    C *= spectra["sweep_rev_dec_phat"]
+    c = irfft(C, n_dec, workers=FFT_WORKERS, overwrite_x=True)[:len(rec_dec) + nr - 1]
+    kc = abs_argmax(c)
+
+    # A real onset stands ~40-130x above the PHAT background; noise/hum alone
+    # peaks around 5x. If the coarse hit isn't clearly a sweep, don't trust
+    # its neighbourhood -- fall back to one exact full-rate correlation.
+    ratio = abs(float(c[kc])) / (float(np.sqrt(np.dot(c, c) / c.size)) + 1e-30)
+    if ratio < XCORR_MIN_PEAK_RATIO:
+        print(f"[SWEEP] WARNING: weak coarse onset peak ({ratio:.1f}x) — using full-rate xcorr")
+        L = len(rec) + len(ref) - 1
+        n = next_fast_len(L, real=True)
+        R = rfft(rec, n, workers=FFT_WORKERS)
+        R *= rfft(ref[::-1], n, workers=FFT_WORKERS)
+        full = irfft(R, n, workers=FFT_WORKERS, overwrite_x=True)[:L]
+        return max(0, abs_argmax(full) - (len(ref) - 1))
+
+    return (kc - (nr - 1)) * q
+
+def sweep_onset_and_ir(rec, ref, spectra, used_len, fs, q=XCORR_DECIM):
+    """
+    Sweep onset in rec plus the deconvolved IR, sharing one forward FFT:
+      1. coarse onset from the decimated GCC-PHAT search
+      2. one rfft of the segment starting 2q before it, multiplied by the
+         stacked [matched filter; Farina inverse] spectra and inverted as a
+         batch: row 0 is the full-rate xcorr over the +/-2q lags around the
+         coarse hit, row 1 the IR (its peak-centred crop makes the few
+         samples of lead-in irrelevant)
+    n_fft leaves slack past used_len (see gen_log_sweep_with_spectra), so
+    the extra 4q samples don't alias into either result.
+    Returns (onset_index, ir).
+    """
+    nref = len(ref)
+    k0 = _coarse_onset_index(rec, ref, spectra, q)
+    lo = max(0, k0 - 2 * q)
+    hi = max(lo, min(k0 + 2 * q, len(rec) - nref))
+    seg = rec[lo:lo + int(used_len) + (hi - lo)]
+
+    n_fft = spectra["n_fft"]
+    P = rfft(seg, n_fft, workers=FFT_WORKERS) * spectra["ref_f"]   # (2, bins)
+    out = irfft(P, n_fft, axis=-1, workers=FFT_WORKERS, overwrite_x=True)
+
+    onset = lo + abs_argmax(out[0, nref - 1:nref + hi - lo])
+    ir = _ir_window(out[1, :min(len(seg) + nref - 1, n_fft)], fs)
+    return onset, ir
 
 # FIX: keep the IR tail for RT/EDT, don’t truncate to len(y), and don’t normalise the *saved* IR.
 IR_PRE_ROLL_S   = 0.10   # seconds before peak to include
 IR_WINDOW_S     = 4.0    # seconds after peak to keep (captures decay tail for RT/EDT)
 IR_NORM_FOR_PLOT = True  # only affects plotted IR, not saved impulse.wav
 
-def deconvolve(y, inv, fs):
+def deconvolve(y, inv_f, n_fft, inv_len, fs):
     """
     Deconvolve recorded sweep segment into an impulse response.
+    inv_f is the precomputed inverse-filter spectrum at n_fft points.
     Keeps a fixed window long enough for RT/EDT (instead of truncating to len(y)).
     Saves *raw* IR amplitude (no normalisation) so decay maths works.
     """
-    ir_full = fftconvolve(y, inv, mode="full").astype(np.float32)
-    if ir_full.size == 0 or not np.isfinite(ir_full).any():
+    L = min(len(y) + inv_len - 1, n_fft)   # n_fft may be shorter than the full linear result
+    Y = rfft(y, n_fft, workers=FFT_WORKERS)
+    Y *= inv_f                       # Farina: pointwise product, no time-domain pass
+    return _ir_window(irfft(Y, n_fft, workers=FFT_WORKERS, overwrite_x=True)[:L], fs)
+
+def _ir_window(ir_full, fs):
+    """Crop the kept IR window around the peak of a full deconvolution."""
+    if ir_full.size == 0:
         return np.array([], dtype=np.float32)
 
-    p = int(np.argmax(np.abs(ir_full)))
+    p = abs_argmax(ir_full)
+    if not np.isfinite(ir_full[p]):
+        return np.array([], dtype=np.float32)
 
     pre = int(IR_PRE_ROLL_S * fs)
     win = int(IR_WINDOW_S * fs)
@@ -238,51 +425,96 @@ def deconvolve(y, inv, fs):
     s = max(p - pre, 0)
     e = min(s + win, ir_full.size)
 
-    ir = ir_full[s:e].astype(np.float32, copy=False)
+    ir = ir_full[s:e].astype(np.float32)   # copy so the full buffer can be freed
     return ir
 
 def mag_response(ir, fs):
+    # ir comes out of deconvolve() already finite (recording is nan_to_num'd,
+    # non-finite peaks are rejected), so no sanitising pass here.
     L = int(len(ir))
-    if L < 8 or not np.isfinite(ir).any():
+    if L < 8:
         return np.array([]), np.array([])
-    n = 1 << (L - 1).bit_length()
-    F = np.fft.rfft(ir, n=n)
-    A = np.abs(F).astype(np.float64)
-    A[~np.isfinite(A)] = 0.0
-    mag = 20.0 * np.log10(np.maximum(A, 1e-12))
-    freqs = np.fft.rfftfreq(n, 1.0 / float(fs))[1:]
-    mag   = mag[1:]
+    n = next_fast_len(L, real=True)
+    F = rfft(ir, n, workers=FFT_WORKERS)
+    # One |F| allocation, then clamp/log/scale in place on it.
+    mag = np.abs(F[1:])
+    np.maximum(mag, 1e-12, out=mag)
+    np.log10(mag, out=mag)
+    mag *= 20.0
+    freqs = rfftfreq(n, 1.0 / float(fs))[1:]
     return freqs, mag
 
 
 # ------------------------------------------------------------------
 #  playback helpers
 # ------------------------------------------------------------------
-def write_temp_wav(stereo, fs):
-    td = tempfile.TemporaryDirectory()
-    p  = os.path.join(td.name, "sweep.wav")
-    sf.write(p, stereo, fs, subtype="PCM_16")
-    return td, p
-
 def play_via_aplay(stereo, fs, alsa_device=None):
-    td, path = write_temp_wav(stereo, fs)
-    try:
-        # NO FALLBACKS. If you didn't pass an ALSA device, fail loudly.
-        if not alsa_device:
-            raise RuntimeError("play_via_aplay requires --alsa-device (e.g. plughw:CARD=sndrpihifiberry,DEV=0)")
-
-        cmd = ["aplay", "-q", "-D", alsa_device, path]
-        print(f"[SWEEP] running: {' '.join(cmd)}")
-        subprocess.run(cmd, check=True, capture_output=True)
-        time.sleep(1.0)  # let ALSA flush
-    finally:
-        td.cleanup()
+    # NO FALLBACKS. If you didn't pass an ALSA device, fail loudly.
+    if not alsa_device:
+        raise RuntimeError("play_via_aplay requires --alsa-device (e.g. plughw:CARD=sndrpihifiberry,DEV=0)")
+
+    # Raw S16_LE straight into aplay's stdin -- no temp WAV written, synced
+    # and re-read. 16-bit as before, so plain hw: devices still accept it;
+    # quantised the way libsndfile did it (floor(x * 2^15), clipped).
+    stereo = np.asarray(stereo, dtype=np.float32)
+    pcm = np.clip(np.floor(stereo * np.float32(32768.0)), -32768, 32767).astype("<i2")
+    cmd = ["aplay", "-q", "-D", alsa_device, "-t", "raw", "-f", "S16_LE",
+           "-r", str(int(fs)), "-c", str(stereo.shape[1] if stereo.ndim == 2 else 1)]
+    print(f"[SWEEP] running: {' '.join(cmd)}")
+    subprocess.run(cmd, input=pcm.tobytes(), check=True, capture_output=True)
+    time.sleep(1.0)  # let ALSA flush
+
+
+def play_via_portaudio(sweep, fs, out_dev=None, route=route_to_both):
+    """
+    Stream the mono sweep straight from its buffer: the callback copies each
+    block into the routed output column(s), so no Nx2 stereo copy is built.
+    Blocks until the whole sweep has been played.
+    """
+    print(f"[SWEEP] playing on device {out_dev}  name={sd.query_devices(out_dev)['name']}")
+    cols = ROUTE_COLUMNS[route]
+    sweep = np.ascontiguousarray(sweep, dtype=np.float32)
+    pos = 0
+    done = threading.Event()
+
+    def callback(outdata, frames, _time, _status):
+        nonlocal pos
+        chunk = sweep[pos:pos + frames]
+        n = len(chunk)
+        outdata.fill(0)
+        for c in cols:
+            outdata[:n, c] = chunk
+        pos += n
+        if n < frames:
+            raise sd.CallbackStop
+
+    with sd.OutputStream(samplerate=fs, channels=2, dtype="float32", device=out_dev,
+                         callback=callback, finished_callback=done.set):
+        done.wait()
+
+
+def open_capture(buf, fs, in_dev=None):
+    """
+    Mono InputStream that fills the flat float32 buf in place from its
+    callback (no (N,1) array to reshape or copy afterwards) and stops itself
+    once buf is full. Returns (stream, finished_event); the caller starts
+    the stream by entering it as a context manager.
+    """
+    frames = len(buf)
+    pos = 0
+    done = threading.Event()
 
+    def callback(indata, n, _time, _status):
+        nonlocal pos
+        k = min(n, frames - pos)
+        buf[pos:pos + k] = indata[:k, 0]
+        pos += k
+        if pos >= frames:
+            raise sd.CallbackStop
 
-def play_via_portaudio(stereo, fs, out_dev=None):
-    print(f"[SWEEP] playing on device {out_dev}  name={sd.query_devices(out_dev)['name']}")
-    # BLOCKING so we hear the whole sweep
-    sd.play(stereo.astype(np.float32, copy=False), fs, device=out_dev, blocking=True)
+    stream = sd.InputStream(samplerate=fs, channels=1, dtype="float32", device=in_dev,
+                            callback=callback, finished_callback=done.set)
+    return stream, done
 
 
 # ------------------------------------------------------------------
@@ -328,7 +560,7 @@ def _targets_for_layout(root: Path, channel: str, layout: str):
 # ------------------------------------------------------------------
 #  single sweep run
 # ------------------------------------------------------------------
-def run_sweep(session_root, sweep, inv, fs, args, channel_label, stereo_sweep):
+def run_sweep(session_root, sweep, spectra, fs, args, channel_label, route):
     log_base = Path(session_root) / channel_label
     log_base.mkdir(parents=True, exist_ok=True)
     print(f"[SWEEP] entered run_sweep, channel={channel_label}, playback={args.playback}, out_dev={args.out_dev}")
@@ -346,24 +578,26 @@ def run_sweep(session_root, sweep, inv, fs, args, channel_label, stereo_sweep):
 
         # --- 1. start recording (pre-pad) ------------------------------------
         update_status(f"Recording {channel_label} mic input…", 12 if channel_label=="left" else 40)
-        rec = sd.rec(total_frames, channels=1, dtype="float32", device=args.in_dev, blocking=False)
+        rec_raw = np.empty(total_frames, dtype=np.float32)
+        capture, captured = open_capture(rec_raw, fs, args.in_dev)
 
-        print(f"[SWEEP] about to choose playback, args.playback={args.playback}, aplay avail={shutil.which('aplay') is not None}")
-        print(f"[DEBUG] Stereo sweep routing shape for {channel_label}: {stereo_sweep.shape}")
-        print(f"[DEBUG] First 10 samples (L,R): {stereo_sweep[:10]}")
+        with capture:
+            print(f"[SWEEP] about to choose playback, args.playback={args.playback}, aplay avail={shutil.which('aplay') is not None}")
+            print(f"[DEBUG] Stereo sweep routing shape for {channel_label}: {(len(sweep), 2)}")
+            print(f"[DEBUG] First 10 samples (L,R): {route(sweep[:10])}")
 
-        if SWEEP_CANCELLED:
-            raise RuntimeError("Sweep cancelled by user")
+            if SWEEP_CANCELLED:
+                raise RuntimeError("Sweep cancelled by user")
 
-        # --- 2. playback ------------------------------------------------------
-        update_status(f"Playing {channel_label} test sweep…", 18 if channel_label=="left" else 45)
+            # --- 2. playback --------------------------------------------------
+            update_status(f"Playing {channel_label} test sweep…", 18 if channel_label=="left" else 45)
 
-        if args.playback == "aplay" or (args.playback == "auto" and shutil.which("aplay")):
-            play_via_aplay(stereo_sweep, fs, args.alsa_device)
-        else:
-            play_via_portaudio(stereo_sweep, fs, args.out_dev)
+            if args.playback == "aplay" or (args.playback == "auto" and shutil.which("aplay")):
+                play_via_aplay(route(sweep), fs, args.alsa_device)
+            else:
+                play_via_portaudio(sweep, fs, args.out_dev, route)
 
-        sd.wait()   # wait for record to finish
+            captured.wait()   # wait for record to finish
 
         if SWEEP_CANCELLED:
             raise RuntimeError("Sweep cancelled by user")
@@ -371,45 +605,56 @@ def run_sweep(session_root, sweep, inv, fs, args, channel_label, stereo_sweep):
         # --- 3. process recording -------------------------------------------
         update_status(f"Processing {channel_label} recording…", 25 if channel_label=="left" else 55)
 
-        rec_raw = np.nan_to_num(np.asarray(rec, dtype=np.float32).flatten())
-        rms = float(np.sqrt(np.mean(rec_raw**2))) if rec_raw.size else 0.0
+        rms = rms_of(rec_raw)
+        if not np.isfinite(rms):
+            # any NaN/inf poisons the dot product, so the RMS doubles as the
+            # finite check -- clean captures never pay for the scrub pass
+            np.nan_to_num(rec_raw, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+            rms = rms_of(rec_raw)
         print(f"[DEBUG] {channel_label} RMS={rms:.6f}  Frames={len(rec_raw)}")
 
         if rms < 1e-6:
             raise RuntimeError("Recording silent (RMS < 1e-6).")
 
-        start_idx = xcorr_peak_index(rec_raw, sweep)
-        end_idx   = min(start_idx + len(sweep) + int(fs * args.postpad), len(rec_raw))
-        rec_used  = rec_raw[start_idx:end_idx].copy()
-
-        ir = deconvolve(rec_used, inv, fs)
-        freqs, mag = mag_response(ir, fs)
-
-        # -------------------------------------------------------------
-        # DEBUG: Impulse Response Peak Details
-        # -------------------------------------------------------------
-        if ir is not None and len(ir) > 0:
-            peak_idx = int(np.argmax(np.abs(ir)))
-            peak_val = float(ir[peak_idx])
-            print(f"[DEBUG] IR peak frame={peak_idx}  value={peak_val:.4f}")
-            print(f"[DEBUG] IR length frames={len(ir)}  seconds={len(ir)/float(fs):.3f}")
-        else:
-            print("[DEBUG] IR EMPTY or invalid!")
-
-        meta = dict(
-            fs=fs, dur=args.dur, f0=args.f0, f1=args.f1,
-            in_dev=args.in_dev, out_dev=args.out_dev,
-            prepad=args.prepad, postpad=args.postpad,
-            playback=args.playback, alsa_device=args.alsa_device,
-            sweep_onset_frame=start_idx,
-            timestamp=datetime.now().isoformat(),
-            channel=channel_label,
-            layout=args.layout,
-            ir_window_s=IR_WINDOW_S,
-            ir_pre_roll_s=IR_PRE_ROLL_S,
-        )
-
-        save_all(session_root, channel_label, fs, sweep, rec_raw, rec_used, ir, freqs, mag, meta, args.layout)
+        # sweep.wav / mic_recording_raw.wav are final already: write them
+        # while the DSP below runs (libsndfile + file I/O release the GIL)
+        with ThreadPoolExecutor(max_workers=2) as io_pool:
+            early = start_early_writes(io_pool, session_root, channel_label, args.layout, fs,
+                                       sweep=sweep, mic_recording_raw=rec_raw)
+
+            used_len  = len(sweep) + int(fs * args.postpad)
+            start_idx, ir = sweep_onset_and_ir(rec_raw, sweep, spectra, used_len, fs)
+            end_idx   = min(start_idx + used_len, len(rec_raw))
+            rec_used  = rec_raw[start_idx:end_idx]   # view; nothing downstream mutates it
+
+            freqs, mag = mag_response(ir, fs)
+
+            # -------------------------------------------------------------
+            # DEBUG: Impulse Response Peak Details
+            # -------------------------------------------------------------
+            if ir is not None and len(ir) > 0:
+                peak_idx = abs_argmax(ir)
+                peak_val = float(ir[peak_idx])
+                print(f"[DEBUG] IR peak frame={peak_idx}  value={peak_val:.4f}")
+                print(f"[DEBUG] IR length frames={len(ir)}  seconds={len(ir)/float(fs):.3f}")
+            else:
+                print("[DEBUG] IR EMPTY or invalid!")
+
+            meta = dict(
+                fs=fs, dur=args.dur, f0=args.f0, f1=args.f1,
+                in_dev=args.in_dev, out_dev=args.out_dev,
+                prepad=args.prepad, postpad=args.postpad,
+                playback=args.playback, alsa_device=args.alsa_device,
+                sweep_onset_frame=start_idx,
+                timestamp=datetime.now().isoformat(),
+                channel=channel_label,
+                layout=args.layout,
+                ir_window_s=IR_WINDOW_S,
+                ir_pre_roll_s=IR_PRE_ROLL_S,
+            )
+
+            save_all(session_root, channel_label, fs, sweep, rec_raw, rec_used, ir, freqs, mag, meta, args.layout,
+                     early=early)
         print(f"Saved {channel_label} in '{session_root}'")
 
         # 🔥 Tell UI we’re done with this channel
@@ -434,25 +679,78 @@ def run_sweep(session_root, sweep, inv, fs, args, channel_label, stereo_sweep):
 # ------------------------------------------------------------------
 #  plot + save bundle
 # ------------------------------------------------------------------
-def save_all(session_root, channel, fs, sweep, rec_raw, rec_used, ir, freqs, mag, meta, layout):
+_PLOT_FIGS = {}
+
+# impulse_response.png / response.png are diagnostic snapshots only -- the
+# UI and analysis work from impulse.wav / response.csv -- so they are
+# rendered at screen resolution rather than print quality.
+PLOT_DPI         = 100
+PLOT_MAX_BUCKETS = 1400   # ~1.5 buckets per pixel on a 9 in / 100 dpi PNG
+
+def _minmax_envelope(y, bounds):
+    """
+    Min/max of y over each [bounds[i], bounds[i+1]) slice, interleaved, so a
+    decimated line still shows every peak and notch. Returns (idx, values).
+    """
+    lo = np.minimum.reduceat(y, bounds)
+    hi = np.maximum.reduceat(y, bounds)
+    return np.repeat(bounds, 2), np.column_stack([lo, hi]).ravel()
+
+def _plot_axes(kind, figsize):
+    """
+    One figure/axes per plot kind, built on first use and cleared between
+    channels instead of constructing a new Agg canvas every time.
+    Plain Figure + Agg canvas: nothing goes through pyplot's global state.
+    """
+    if kind not in _PLOT_FIGS:
+        fig = Figure(figsize=figsize, dpi=PLOT_DPI)
+        FigureCanvasAgg(fig)
+        _PLOT_FIGS[kind] = (fig, fig.add_subplot(111))
+    fig, ax = _PLOT_FIGS[kind]
+    ax.clear()
+    return fig, ax
+
+IO_WRITERS = 8   # concurrent artefact writes in save_all()
+
+def start_early_writes(executor, session_root, channel, layout, fs, **arrays):
+    """
+    Queue WAVs whose data is final as soon as recording stops (keyword =
+    target key) so encoding + writing overlaps the DSP. Returns {key: Future};
+    hand it to save_all(early=...) which skips those keys and waits on them.
+    """
+    target_sets = _targets_for_layout(Path(session_root), channel, layout)
+
+    def write(key, data):
+        payload = wav_bytes(data, fs, WAV_SUBTYPES.get(key, WAV_SUBTYPE_DEFAULT))
+        for targets in target_sets:
+            _atomic_write_bytes(payload, targets[key], sync=not batch_sync_available())
+
+    return {key: executor.submit(write, key, data) for key, data in arrays.items()}
+
+def save_all(session_root, channel, fs, sweep, rec_raw, rec_used, ir, freqs, mag, meta, layout, early=None):
     root = Path(session_root)
     target_sets = _targets_for_layout(root, channel, layout)
+    early = early or {}
 
-    # build CSV text once
-    lines = ["freq_hz,mag_db\n"]
-    lines += [f"{float(fr):.6f},{float(db):.2f}\n" for fr, db in zip(freqs, mag)]
-    csv_text = "".join(lines)
+    # build CSV bytes once: one %-format over the whole table runs the row
+    # loop in C (np.savetxt still formats row by row in Python)
+    cells = np.column_stack([freqs, mag]).ravel().tolist()
+    csv_bytes = ("freq_hz,mag_db\n" + ("%.6f,%.2f\n" * len(freqs)) % tuple(cells)).encode("ascii")
 
     # IR plot (optionally normalise FOR PLOT ONLY)
     try:
-        ir_plot = ir
-        if IR_NORM_FOR_PLOT and ir_plot is not None and len(ir_plot) > 0:
-            m = float(np.max(np.abs(ir_plot))) + 1e-12
+        # Agg strokes every vertex, so plot a per-bucket min/max envelope
+        # rather than all ~200k IR samples
+        if len(ir) > 2 * PLOT_MAX_BUCKETS:
+            idx, ir_plot = _minmax_envelope(ir, np.arange(0, len(ir), len(ir) // PLOT_MAX_BUCKETS))
+        else:
+            idx, ir_plot = np.arange(len(ir)), ir
+        if IR_NORM_FOR_PLOT and len(ir_plot) > 0:
+            m = abs(float(ir_plot[abs_argmax(ir_plot)])) + 1e-12
             ir_plot = (ir_plot / m).astype(np.float32, copy=False)
 
-        t = np.arange(len(ir_plot)) / float(fs)
-        fig_ir = plt.figure(figsize=(9, 4))
-        ax = fig_ir.add_subplot(111)
+        t = idx / float(fs)
+        fig_ir, ax = _plot_axes("ir", (9, 4))
         ax.plot(t, ir_plot)
         ax.set(xlabel="Time (s)", ylabel="Amplitude", title=f"Impulse Response ({channel})")
         ax.grid(True, ls=":")
@@ -462,41 +760,56 @@ def save_all(session_root, channel, fs, sweep, rec_raw, rec_used, ir, freqs, mag
 
     # FR plot
     try:
-        fig_fr = plt.figure(figsize=(9, 5))
-        ax = fig_fr.add_subplot(111)
-        ax.semilogx(freqs, mag)
+        # same envelope trick on log-spaced buckets to match the log axis
+        if len(freqs) > 2 * PLOT_MAX_BUCKETS:
+            edges = np.geomspace(freqs[0], freqs[-1], PLOT_MAX_BUCKETS)
+            idx, mag_plot = _minmax_envelope(mag, np.unique(np.searchsorted(freqs, edges)))
+            fr_plot = freqs[idx]
+        else:
+            fr_plot, mag_plot = freqs, mag
+        fig_fr, ax = _plot_axes("fr", (9, 5))
+        ax.semilogx(fr_plot, mag_plot)
         ax.set(xlabel="Frequency (Hz)", ylabel="Magnitude (dB)", title=f"Frequency Response ({channel})")
         ax.grid(True, which="both", ls=":")
         fig_fr.tight_layout()
     except Exception:
         fig_fr = None
 
+    # Encode every artefact once, up front: the "both" layout then just
+    # writes the same bytes twice instead of re-encoding WAVs / re-rendering PNGs,
+    # and the write phase is a tight burst of plain byte writes.
+    payloads = {
+        "sweep":              None if "sweep" in early else wav_bytes(sweep, fs, WAV_SUBTYPES["sweep"]),
+        "mic_recording_raw":  None if "mic_recording_raw" in early else wav_bytes(rec_raw, fs),
+        "mic_recording_used": wav_bytes(rec_used, fs),
+        "impulse":            wav_bytes(ir, fs),
+        "response_csv":       csv_bytes,
+        "impulse_png":        png_bytes(fig_ir) if fig_ir is not None else None,
+        "response_png":       png_bytes(fig_fr) if fig_fr is not None else None,
+        # JSON (FIX: write meta for EACH target set; your old code wrote only the last one)
+        "meta_json":          json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"),
+    }
+
+    writes = []
     for targets in target_sets:
-        # WAVs
-        write_wav_atomic(targets["sweep"], sweep, fs)
-        write_wav_atomic(targets["mic_recording_raw"], rec_raw, fs)
-        write_wav_atomic(targets["mic_recording_used"], rec_used, fs)
-        write_wav_atomic(targets["impulse"], ir, fs)
+        print(f"[DEBUG] save_all called, meta_json={targets['meta_json']}")
+        writes += [(data, targets[key]) for key, data in payloads.items() if data is not None]
 
-        # CSV
-        write_text_atomic(csv_text, targets["response_csv"])
+    # On Linux the writes skip their own fsync and one syncfs() at the end
+    # flushes the whole batch (SD cards pay per barrier, not per byte).
+    # Elsewhere every write ends in its own fsync; those block in the kernel
+    # with the GIL released, so running them side by side overlaps the flush
+    # latency. Only plain bytes cross threads here -- all matplotlib work
+    # already happened above on this thread.
+    batched = batch_sync_available()
+    with ThreadPoolExecutor(max_workers=max(1, min(IO_WRITERS, len(writes)))) as ex:
+        list(ex.map(lambda w: _atomic_write_bytes(*w, sync=not batched), writes))
 
-        # PNGs
-        if fig_ir is not None:
-            savefig_atomic(fig_ir, targets["impulse_png"], dpi=150)
-        if fig_fr is not None:
-            savefig_atomic(fig_fr, targets["response_png"], dpi=150)
+    for fut in early.values():
+        fut.result()   # re-raises a failed early write
 
-        # JSON (FIX: write meta for EACH target set; your old code wrote only the last one)
-        print(f"[DEBUG] save_all called, meta_json={targets['meta_json']}")
-        write_json_atomic(meta, targets["meta_json"])
-
-    # close figures
-    try:
-        if fig_ir: plt.close(fig_ir)
-        if fig_fr: plt.close(fig_fr)
-    except Exception:
-        pass
+    # single durability barrier for every file + link/rename above
+    sync_written((p for targets in target_sets for p in targets.values()), batched)
 
 
 # ------------------------------------------------------------------
@@ -556,6 +869,19 @@ def main():
             args.f1 = float(curve.x[-1])
             print(f"[SWEEP] using {speaker_key} limits {args.f0:.0f} Hz – {args.f1:.0f} Hz")
 
+    # Sweep parameters are final now: synthesise the sweep + kernel spectra
+    # in the background (numpy / pocketfft release the GIL) while the
+    # PortAudio device queries and debug logging below run.
+    fs = int(args.fs)
+    max_rec_len  = int(fs * (args.prepad + args.dur + args.postpad))
+    max_used_len = int(fs * args.dur) + int(fs * args.postpad)   # rec_used: onset .. sweep + postpad
+    prep_pool = ThreadPoolExecutor(max_workers=1)
+    prep = prep_pool.submit(gen_log_sweep_with_spectra, fs, args.dur, args.f0, args.f1, max_rec_len, max_used_len)
+    prep_pool.shutdown(wait=False)
+
+    in_info  = dev_info(args.in_dev, 'input')
+    out_info = dev_info(args.out_dev, 'output')
+
     # ==========================================================
     # 🔥 DEBUG: LOG SPEAKER PROFILE + SWEEP CONFIG DETAILS
     # ==========================================================
@@ -564,8 +890,8 @@ def main():
     print(f"Sweep Duration (s):  {args.dur:.2f}")
     print(f"Sweep Range (Hz):    {args.f0:.1f} → {args.f1:.1f}")
     print(f"Playback Backend:    {args.playback}")
-    print(f"Input Device (idx):  {args.in_dev}  info={dev_info(args.in_dev, 'input')}")
-    print(f"Output Device (idx): {args.out_dev} info={dev_info(args.out_dev, 'output')}")
+    print(f"Input Device (idx):  {args.in_dev}  info={in_info}")
+    print(f"Output Device (idx): {args.out_dev} info={out_info}")
     print("=================================\n")
 
     # And log it to session debug once outdir exists
@@ -576,8 +902,8 @@ def main():
             f"Sweep Duration (s):  {args.dur:.2f}",
             f"Sweep Range (Hz):    {args.f0:.1f} → {args.f1:.1f}",
             f"Playback Backend:    {args.playback}",
-            f"Input Dev Info:      {dev_info(args.in_dev, 'input')}",
-            f"Output Dev Info:     {dev_info(args.out_dev, 'output')}",
+            f"Input Dev Info:      {in_info}",
+            f"Output Dev Info:     {out_info}",
             "================================="
         ])
     except Exception as e:
@@ -586,17 +912,16 @@ def main():
     # ------------------------------------------------------------------
     # Prepare session + sweep
     # ------------------------------------------------------------------
-    fs = int(args.fs)
-    sweep, inv = gen_log_sweep(fs, args.dur, args.f0, args.f1)
-    print(f"[SWEEP] stimulus shape={sweep.shape}  max={sweep.max():.3f}  rms={np.sqrt(np.mean(sweep**2)):.3f}")
+    sweep, spectra = prep.result()
+    print(f"[SWEEP] stimulus shape={sweep.shape}  max={sweep.max():.3f}  rms={rms_of(sweep):.3f}")
 
     outdir = Path(session_dir())
 
     Path(outdir).mkdir(parents=True, exist_ok=True)
 
     write_log(outdir, [
-        "IN_DEV_INFO:",  dev_info(args.in_dev, 'input'),
-        "OUT_DEV_INFO:", dev_info(args.out_dev, 'output')
+        "IN_DEV_INFO:",  in_info,
+        "OUT_DEV_INFO:", out_info
     ])
 
     global SWEEP_CANCELLED
@@ -606,10 +931,10 @@ def main():
     # Run sweeps
     # ------------------------------------------------------------------
     if args.mode in ("left", "both"):
-        run_sweep(outdir, sweep, inv, fs, args, "left", route_to_left(sweep))
+        run_sweep(outdir, sweep, spectra, fs, args, "left", route_to_left)
 
     if args.mode in ("right", "both"):
-        run_sweep(outdir, sweep, inv, fs, args, "right", route_to_right(sweep))
+        run_sweep(outdir, sweep, spectra, fs, args, "right", route_to_right)
 
     write_session_meta(outdir, fs, args, speaker_key)
 
@@ -631,16 +956,12 @@ def main():
     # ---------------------------------------------------------
     # Auto-run analysis on completed sweep
     # ---------------------------------------------------------
+    # In-process: numpy/scipy/soundfile are already loaded here, so a
+    # second interpreter would only repeat start-up and imports.
     try:
         print("[SWEEP] Running analysis…")
-        subprocess.run(
-            [
-                sys.executable,
-                str(Path(__file__).parent / "analyse.py"),
-                outdir,
-            ],
-            check=True,
-        )
+        from measurelyapp.analyse import analyse
+        analyse(Path(outdir))
     except Exception as e:
         print(f"[SWEEP] Analysis failed: {e}")
 
@@ -648,19 +969,21 @@ def main():
     # ------------------------------------------------------------------
     # Write session-level meta.json (FIX)
     # ------------------------------------------------------------------
-    write_json_atomic({
-        "fs": fs,
-        "dur": args.dur,
-        "f0": args.f0,
-        "f1": args.f1,
-        "in_dev": args.in_dev,
-        "out_dev": args.out_dev,
-        "playback": args.playback,
-        "alsa_device": args.alsa_device,
-        "layout": args.layout,
-        "speaker_key": speaker_key,
-        "timestamp": datetime.now().isoformat(),
-    }, Path(outdir) / "meta.json")
+    meta_file = Path(outdir) / "meta.json"
+    with meta_lock(meta_file):
+        write_json_atomic({
+            "fs": fs,
+            "dur": args.dur,
+            "f0": args.f0,
+            "f1": args.f1,
+            "in_dev": args.in_dev,
+            "out_dev": args.out_dev,
+            "playback": args.playback,
+            "alsa_device": args.alsa_device,
+            "layout": args.layout,
+            "speaker_key": speaker_key,
+            "timestamp": datetime.now().isoformat(),
+        }, meta_file)
 
     # ------------------------------------------------------------------
     # Update latest/ symlink (ONLY IF SWEEP OK)
@@ -1,23 +1,176 @@
 from pathlib import Path
-import json, os, tempfile, logging
+from contextlib import contextmanager
+import json, os, fcntl, threading, logging
 
 log = logging.getLogger("measurely")
 
-def _atomic_write_bytes(data: bytes, dest: Path):
+# ------------------------------------------------------------------
+#  atomic file I/O (shared by sweep.py, writer.py, ...)
+# ------------------------------------------------------------------
+_AT_FDCWD          = -100
+_AT_SYMLINK_FOLLOW = 0x400
+_linkat = None          # libc linkat, resolved on first use (False = unavailable)
+_syncfs = None          # libc syncfs, same
+
+def _libc_linkat():
+    # os.link() won't pass AT_SYMLINK_FOLLOW on Linux (CPython < 3.13), which
+    # /proc/self/fd/N needs to materialise an O_TMPFILE file -- go to libc.
+    global _linkat
+    if _linkat is None:
+        try:
+            import ctypes
+            fn = ctypes.CDLL(None, use_errno=True).linkat
+            fn.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+            _linkat = fn
+        except Exception:
+            _linkat = False
+    return _linkat or None
+
+def _libc_syncfs():
+    # Linux-only, and not wrapped by the os module
+    global _syncfs
+    if _syncfs is None:
+        try:
+            import ctypes
+            fn = ctypes.CDLL(None, use_errno=True).syncfs
+            fn.argtypes = [ctypes.c_int]
+            _syncfs = fn
+        except Exception:
+            _syncfs = False
+    return _syncfs or None
+
+def _link_fd(fd, dest: Path):
+    import ctypes
+    src = f"/proc/self/fd/{fd}".encode()
+    if _linkat(_AT_FDCWD, src, _AT_FDCWD, os.fsencode(str(dest)), _AT_SYMLINK_FOLLOW) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), str(dest))
+
+def _tmp_name(dest: Path) -> Path:
+    # hidden, unique per process + thread, so concurrent writers never collide
+    return dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def _publish_tmpfile(fd, dest: Path):
+    """Give an unnamed O_TMPFILE file its final name."""
+    try:
+        _link_fd(fd, dest)
+    except FileExistsError:
+        # linkat never overwrites, so hop via a hidden name and rename over
+        tmp = _tmp_name(dest)
+        try: os.unlink(tmp)
+        except FileNotFoundError: pass
+        _link_fd(fd, tmp)
+        os.replace(tmp, dest)
+
+_o_tmpfile_ok = hasattr(os, "O_TMPFILE")
+
+def _atomic_write_with(dest: Path, write_fn, sync=True):
+    """
+    Atomically create dest from write_fn(fileobj).
+    Prefers an O_TMPFILE file in the target dir (never visible half-written,
+    nothing to clean up on failure); falls back to a hidden temp name +
+    os.replace on filesystems/kernels without O_TMPFILE. Both paths are raw
+    os.open() -- no NamedTemporaryFile name search per write.
+    sync=False skips the file fsync for callers that flush a whole batch
+    with sync_written() afterwards.
+    Directory entries are NOT fsynced here -- see fsync_dirs() / sync_written().
+    """
+    global _o_tmpfile_ok
     dest = Path(dest)
     dest.parent.mkdir(parents=True, exist_ok=True)
-    with tempfile.NamedTemporaryFile(dir=str(dest.parent), delete=False) as tf:
-        tf.write(data)
-        tf.flush()
-        os.fsync(tf.fileno())
-        tmp = tf.name
-    os.replace(tmp, dest)
+
+    if _o_tmpfile_ok and _libc_linkat():
+        try:
+            fd = os.open(str(dest.parent), os.O_TMPFILE | os.O_WRONLY, 0o644)
+        except OSError:
+            fd = None
+        if fd is not None:
+            with os.fdopen(fd, "wb") as f:
+                write_fn(f)
+                f.flush()
+                if sync: os.fsync(f.fileno())
+                try:
+                    _publish_tmpfile(f.fileno(), dest)
+                    return
+                except OSError as e:
+                    # no /proc, EXDEV, ... -- stop trying for this process
+                    log.warning("O_TMPFILE publish failed (%s); using temp name + rename", e)
+                    _o_tmpfile_ok = False
+
+    tmp = _tmp_name(dest)
+    try:
+        with os.fdopen(os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644), "wb") as f:
+            write_fn(f)
+            f.flush()
+            if sync: os.fsync(f.fileno())
+        os.replace(tmp, dest)
+    finally:
+        try: os.unlink(tmp)
+        except FileNotFoundError: pass
+
+def fsync_dirs(paths):
+    """fsync each distinct parent dir once so the renames/links are durable."""
+    for d in {Path(p).parent for p in paths}:
+        try:
+            fd = os.open(str(d), os.O_RDONLY)
+        except OSError:
+            continue
+        try: os.fsync(fd)
+        except OSError: pass
+        finally: os.close(fd)
+
+def batch_sync_available():
+    """True if sync_written() can flush a batch written with sync=False."""
+    return _libc_syncfs() is not None
+
+def sync_written(paths, batched):
+    """
+    Make a batch of atomic writes durable. batched (sync=False writes): one
+    syncfs() per filesystem flushes file data and directory entries in a
+    single barrier. Otherwise the files were fsynced as written and only
+    their parent dirs are left.
+    """
+    if not batched:
+        fsync_dirs(paths)
+        return
+    seen = set()
+    for d in {Path(p).parent for p in paths}:
+        try:
+            fd = os.open(str(d), os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            dev = os.fstat(fd).st_dev
+            if dev not in seen:
+                seen.add(dev)
+                if _syncfs(fd) != 0:
+                    os.sync()
+        finally:
+            os.close(fd)
+
+def _atomic_write_bytes(data: bytes, dest: Path, sync=True):
+    _atomic_write_with(dest, lambda f: f.write(data), sync)
 
 def write_text_atomic(text: str, dest: Path):
-    _atomic_write_bytes(text.encode("utf-8"), Path(dest))
-    log.info("Wrote %s (%d bytes)", dest, len(text.encode("utf-8")))
+    payload = text.encode("utf-8")
+    _atomic_write_bytes(payload, Path(dest))
+    log.info("Wrote %s (%d bytes)", dest, len(payload))
 
 def write_json_atomic(obj, dest: Path):
     payload = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
     _atomic_write_bytes(payload, Path(dest))
     log.info("Wrote %s (%d bytes)", dest, len(payload))
+
+@contextmanager
+def meta_lock(meta_file: Path):
+    """exclusive lock around a meta.json read-modify-write.
+    Locks the session directory itself: write_json_atomic swaps the meta
+    inode, and a sidecar lock file would be left behind in every session.
+    latest/ resolves to the same directory, so both paths share the lock."""
+    fd = os.open(Path(meta_file).parent, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
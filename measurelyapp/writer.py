@@ -1,18 +1,15 @@
 """Atomic file writes + Camilla-DSP YAML."""
-import tempfile, os, json, textwrap
+import json, textwrap
 from pathlib import Path
 
+from measurelyapp.util_io import _atomic_write_bytes
+
 __all__ = ["_atomic_write", "write_text_summary", "yaml_camilla"]
 
 def _atomic_write(path: Path, text: str):
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with tempfile.NamedTemporaryFile("w", dir=path.parent, delete=False, encoding="utf-8") as f:
-        f.write(text)
-        f.flush()
-        os.fsync(f.fileno())
-        tmp = Path(f.name)
-    tmp.replace(path)
-    print(f"saved  {path}  ({len(text.encode())} bytes)")
+    data = text.encode("utf-8")
+    _atomic_write_bytes(data, path)
+    print(f"saved  {path}  ({len(data)} bytes)")
 
 def plain_summary(res: dict) -> tuple[str, list[str]]:
     bands = res.get("band_levels_db", {})
@@ -44,17 +41,16 @@ def write_text_summary(outdir: Path, res):
     _atomic_write(outdir / "summary.txt", "\n".join(lines))
 
 def peq_bands(res, max_bands=4):
+    # filter to the PEQ range first, then rank -- ranking first and cutting at
+    # max_bands*2 could drop in-range modes behind out-of-range ones
+    modes = [m for m in res["modes"] if 15 <= m["freq_hz"] <= 500]
+    modes.sort(key=lambda x: -abs(x["delta_db"]))
     bands = []
-    for m in sorted(res["modes"], key=lambda x: -abs(x["delta_db"]))[:max_bands*2]:
+    for m in modes[:max_bands]:
         f = m["freq_hz"]
-        if f < 15 or f > 500:
-            continue
-        gain = -m["delta_db"]
-        gain = max(-6, min(6, gain))
+        gain = max(-6, min(6, -m["delta_db"]))
         q = 5 if f < 150 else 3.5
         bands.append({"f": round(f, 1), "q": round(q, 2), "gain": round(gain, 2)})
-        if len(bands) >= max_bands:
-            break
     return bands or [{"f": 100, "q": 1, "gain": 0}]
 
 def yaml_camilla(res, target="moode", fs=48000):